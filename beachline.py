@@ -0,0 +1,247 @@
+def is_red(parabolic_arc):
+    return parabolic_arc is not None and parabolic_arc.red
+
+
+class BeachLine:
+    # Red-black tree whose in-order sequence is the beach line from left to right. The arcs themselves are the
+    # tree nodes; their left_arc/right_arc links are kept as in-order threads so neighbour walks stay O(1).
+    def __init__(self):
+        self.root = None
+        self.first = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        parabolic_arc = self.first
+        while parabolic_arc is not None:
+            yield parabolic_arc
+            parabolic_arc = parabolic_arc.right_arc
+
+    def find(self, x, breakpoint_x):
+        parabolic_arc = self.root
+        while parabolic_arc is not None:
+            if parabolic_arc.left_breakpoint is not None and x <= breakpoint_x(parabolic_arc.left_breakpoint):
+                parabolic_arc = parabolic_arc.tree_left
+            elif parabolic_arc.right_breakpoint is not None and x > breakpoint_x(parabolic_arc.right_breakpoint):
+                parabolic_arc = parabolic_arc.tree_right
+            else:
+                return parabolic_arc
+        return None
+
+    def build(self, parabolic_arcs):
+        # Replaces the tree with the given arcs, left to right, as a balanced tree: each subtree is rooted at the
+        # middle of its range, so every leaf sits on one of the two deepest levels, and the deepest one is red.
+        self.root = None
+        self.first = parabolic_arcs[0] if parabolic_arcs else None
+        self.size = len(parabolic_arcs)
+        red_depth = self.size.bit_length() - 1
+        previous = None
+        for parabolic_arc in parabolic_arcs:
+            parabolic_arc.left_arc = previous
+            parabolic_arc.right_arc = None
+            if previous is not None:
+                previous.right_arc = parabolic_arc
+            previous = parabolic_arc
+
+        def subtree(lo, hi, parent, depth):
+            if lo >= hi:
+                return None
+            middle = (lo + hi) // 2
+            node = parabolic_arcs[middle]
+            node.tree_parent = parent
+            node.red = depth == red_depth and depth > 0
+            node.tree_left = subtree(lo, middle, node, depth + 1)
+            node.tree_right = subtree(middle + 1, hi, node, depth + 1)
+            return node
+
+        self.root = subtree(0, self.size, None, 0)
+
+    def insert_first(self, parabolic_arc):
+        parabolic_arc.tree_parent = None
+        parabolic_arc.tree_left = None
+        parabolic_arc.tree_right = None
+        parabolic_arc.red = False
+        parabolic_arc.left_arc = None
+        parabolic_arc.right_arc = None
+        self.root = parabolic_arc
+        self.first = parabolic_arc
+        self.size = 1
+
+    def insert_after(self, parabolic_arc, new_arc):
+        new_arc.tree_left = None
+        new_arc.tree_right = None
+        new_arc.red = True
+        if parabolic_arc.tree_right is None:
+            parabolic_arc.tree_right = new_arc
+            new_arc.tree_parent = parabolic_arc
+        else:
+            # The successor is the leftmost node of the right subtree, so its left slot is free.
+            parabolic_arc.right_arc.tree_left = new_arc
+            new_arc.tree_parent = parabolic_arc.right_arc
+
+        new_arc.left_arc = parabolic_arc
+        new_arc.right_arc = parabolic_arc.right_arc
+        if parabolic_arc.right_arc is not None:
+            parabolic_arc.right_arc.left_arc = new_arc
+        parabolic_arc.right_arc = new_arc
+
+        self.size += 1
+        self.insert_fixup(new_arc)
+
+    def remove(self, parabolic_arc):
+        if parabolic_arc.left_arc is not None:
+            parabolic_arc.left_arc.right_arc = parabolic_arc.right_arc
+        else:
+            self.first = parabolic_arc.right_arc
+        if parabolic_arc.right_arc is not None:
+            parabolic_arc.right_arc.left_arc = parabolic_arc.left_arc
+        self.size -= 1
+
+        removed_red = parabolic_arc.red
+        if parabolic_arc.tree_left is None:
+            child = parabolic_arc.tree_right
+            child_parent = parabolic_arc.tree_parent
+            self.transplant(parabolic_arc, child)
+        elif parabolic_arc.tree_right is None:
+            child = parabolic_arc.tree_left
+            child_parent = parabolic_arc.tree_parent
+            self.transplant(parabolic_arc, child)
+        else:
+            successor = parabolic_arc.right_arc
+            removed_red = successor.red
+            child = successor.tree_right
+            if successor.tree_parent is parabolic_arc:
+                child_parent = successor
+            else:
+                child_parent = successor.tree_parent
+                self.transplant(successor, successor.tree_right)
+                successor.tree_right = parabolic_arc.tree_right
+                successor.tree_right.tree_parent = successor
+            self.transplant(parabolic_arc, successor)
+            successor.tree_left = parabolic_arc.tree_left
+            successor.tree_left.tree_parent = successor
+            successor.red = parabolic_arc.red
+
+        if not removed_red:
+            self.remove_fixup(child, child_parent)
+
+        parabolic_arc.tree_parent = None
+        parabolic_arc.tree_left = None
+        parabolic_arc.tree_right = None
+        parabolic_arc.left_arc = None
+        parabolic_arc.right_arc = None
+
+    def transplant(self, old, new):
+        if old.tree_parent is None:
+            self.root = new
+        elif old is old.tree_parent.tree_left:
+            old.tree_parent.tree_left = new
+        else:
+            old.tree_parent.tree_right = new
+        if new is not None:
+            new.tree_parent = old.tree_parent
+
+    def rotate_left(self, node):
+        pivot = node.tree_right
+        node.tree_right = pivot.tree_left
+        if pivot.tree_left is not None:
+            pivot.tree_left.tree_parent = node
+        self.transplant(node, pivot)
+        pivot.tree_left = node
+        node.tree_parent = pivot
+
+    def rotate_right(self, node):
+        pivot = node.tree_left
+        node.tree_left = pivot.tree_right
+        if pivot.tree_right is not None:
+            pivot.tree_right.tree_parent = node
+        self.transplant(node, pivot)
+        pivot.tree_right = node
+        node.tree_parent = pivot
+
+    def insert_fixup(self, node):
+        while is_red(node.tree_parent):
+            parent = node.tree_parent
+            grandparent = parent.tree_parent
+            if parent is grandparent.tree_left:
+                uncle = grandparent.tree_right
+                if is_red(uncle):
+                    parent.red = False
+                    uncle.red = False
+                    grandparent.red = True
+                    node = grandparent
+                    continue
+                if node is parent.tree_right:
+                    node = parent
+                    self.rotate_left(node)
+                    parent = node.tree_parent
+                parent.red = False
+                grandparent.red = True
+                self.rotate_right(grandparent)
+            else:
+                uncle = grandparent.tree_left
+                if is_red(uncle):
+                    parent.red = False
+                    uncle.red = False
+                    grandparent.red = True
+                    node = grandparent
+                    continue
+                if node is parent.tree_left:
+                    node = parent
+                    self.rotate_right(node)
+                    parent = node.tree_parent
+                parent.red = False
+                grandparent.red = True
+                self.rotate_left(grandparent)
+        self.root.red = False
+
+    def remove_fixup(self, node, parent):
+        while node is not self.root and not is_red(node):
+            if node is parent.tree_left:
+                sibling = parent.tree_right
+                if sibling.red:
+                    sibling.red = False
+                    parent.red = True
+                    self.rotate_left(parent)
+                    sibling = parent.tree_right
+                if not is_red(sibling.tree_left) and not is_red(sibling.tree_right):
+                    sibling.red = True
+                    node = parent
+                    parent = node.tree_parent
+                    continue
+                if not is_red(sibling.tree_right):
+                    sibling.tree_left.red = False
+                    sibling.red = True
+                    self.rotate_right(sibling)
+                    sibling = parent.tree_right
+                sibling.red = parent.red
+                parent.red = False
+                sibling.tree_right.red = False
+                self.rotate_left(parent)
+                node = self.root
+            else:
+                sibling = parent.tree_left
+                if sibling.red:
+                    sibling.red = False
+                    parent.red = True
+                    self.rotate_right(parent)
+                    sibling = parent.tree_left
+                if not is_red(sibling.tree_left) and not is_red(sibling.tree_right):
+                    sibling.red = True
+                    node = parent
+                    parent = node.tree_parent
+                    continue
+                if not is_red(sibling.tree_left):
+                    sibling.tree_right.red = False
+                    sibling.red = True
+                    self.rotate_left(sibling)
+                    sibling = parent.tree_left
+                sibling.red = parent.red
+                parent.red = False
+                sibling.tree_left.red = False
+                self.rotate_right(parent)
+                node = self.root
+        if node is not None:
+            node.red = False
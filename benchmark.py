@@ -0,0 +1,216 @@
+import argparse
+import json
+import math
+import platform
+import time
+import tracemalloc
+import numpy as np
+from fortune import FortuneSweep, SiteEvent
+from voronoi import VoronoiDiagram
+
+DISTRIBUTIONS = ["uniform", "clustered", "grid", "collinear"]
+SIZES = [100, 1000, 10000, 100000, 1000000]
+VIEWPORT = (1900, 1000)
+
+
+def make_points(distribution, site_count, seed):
+    # Sites in a 1000 x 1000 square; the same (distribution, site_count, seed) always gives the same set.
+    rng = np.random.default_rng(seed)
+    if distribution == "uniform":
+        return rng.random((site_count, 2)) * 1000
+    if distribution == "clustered":
+        centers = rng.random((max(site_count // 1000, 1), 2)) * 1000
+        points = centers[rng.integers(len(centers), size=site_count)] + rng.normal(scale=15.0, size=(site_count, 2))
+        return np.clip(points, 0, 1000)
+    if distribution == "grid":
+        side = math.ceil(math.sqrt(site_count))
+        step = 1000 / side
+        cells = np.arange(site_count)
+        return np.column_stack((cells % side * step, cells // side * step))
+    if distribution == "collinear":
+        x = rng.random(site_count) * 1000
+        return np.column_stack((x, 0.5 * x + 100))
+    raise ValueError("unknown distribution %r" % distribution)
+
+
+def time_sweep(points):
+    clock = time.perf_counter
+    start = clock()
+    sweep = FortuneSweep(chunks=(points,))
+    load = clock() - start
+
+    site_time = 0.0
+    circle_time = 0.0
+    site_events = 0
+    circle_events = 0
+    while True:
+        event = sweep.peek_event()
+        if event is None:
+            break
+        start = clock()
+        sweep.step_event()
+        elapsed = clock() - start
+        if isinstance(event, SiteEvent):
+            site_time += elapsed
+            site_events += 1
+        else:
+            circle_time += elapsed
+            circle_events += 1
+
+    start = clock()
+    result = sweep.result()
+    finalisation = clock() - start
+
+    events = site_events + circle_events
+    sweep_time = site_time + circle_time
+    return {
+        "events": events,
+        "site_events": site_events,
+        "circle_events": circle_events,
+        "stale_circle_events": sweep.events.skipped + sweep.events.stale,
+        "vertices": len(result.vertices),
+        "edges": len(result.edges),
+        "events_per_second": events / sweep_time if sweep_time > 0 else None,
+        "phases": {"load": load, "site_events": site_time, "circle_events": circle_time, "finalisation": finalisation},
+        "total_seconds": load + sweep_time + finalisation,
+    }
+
+
+def peak_memory(points):
+    tracemalloc.start()
+    try:
+        sweep = FortuneSweep(chunks=(points,))
+        sweep.run_all()
+        sweep.result()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class RecordingDiagram(VoronoiDiagram):
+    # The visualizer on a canvas that only counts what it is asked to draw, so frames can be timed without Tk.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.calls = dict.fromkeys(("create_line", "create_oval", "coords", "delete", "tag_raise"), 0)
+        self.next_item = 0
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def bind_all(self, *args):
+        pass
+
+    def create_item(self, kind):
+        self.calls[kind] += 1
+        self.next_item += 1
+        return self.next_item
+
+    def create_line(self, *args, **kwargs):
+        return self.create_item("create_line")
+
+    def create_oval(self, *args, **kwargs):
+        return self.create_item("create_oval")
+
+    def coords(self, *args):
+        self.calls["coords"] += 1
+
+    def delete(self, *args):
+        self.calls["delete"] += 1
+
+    def tag_raise(self, *args):
+        self.calls["tag_raise"] += 1
+
+
+def time_render(points, frames):
+    # Sweeps the sites, scaled into the viewport, down the screen in `frames` steps and renders every frame.
+    width, height = VIEWPORT
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-9)
+    scaled = (points - low) / span * (np.array(VIEWPORT) - 100) + 50
+
+    diagram = RecordingDiagram(width, height)
+    diagram.init_diagram(chunks=(scaled,))
+    frame_times = []
+    calls = []
+    for frame in range(frames):
+        diagram.sweep_line.y = (frame + 1) * height / frames
+        diagram.engine.run_until(diagram.sweep_line.y)
+        diagram.dirty = True
+        before = dict(diagram.calls)
+        start = time.perf_counter()
+        diagram.render()
+        frame_times.append(time.perf_counter() - start)
+        calls.append({kind: diagram.calls[kind] - before[kind] for kind in before})
+
+    return {
+        "frames": frames,
+        "mean_frame_seconds": sum(frame_times) / frames,
+        "max_frame_seconds": max(frame_times),
+        "items_created": sum(frame["create_line"] + frame["create_oval"] for frame in calls),
+        "coords_updates": sum(frame["coords"] for frame in calls),
+        "items_deleted": sum(frame["delete"] for frame in calls),
+        "live_items": len(diagram.items),
+        "per_frame": calls,
+    }
+
+
+def run(distributions, sizes, seed, frames, render_limit, memory_limit):
+    results = []
+    for distribution in distributions:
+        for site_count in sizes:
+            points = make_points(distribution, site_count, seed)
+            entry = {"distribution": distribution, "sites": site_count}
+            entry.update(time_sweep(points))
+            if site_count <= memory_limit:
+                entry["peak_memory_bytes"] = peak_memory(points)
+            if site_count <= render_limit:
+                entry["render"] = time_render(points, frames)
+            results.append(entry)
+            print("%-10s %8d sites  %10.0f events/s  %8.3f s" % (distribution, site_count,
+                                                               entry["events_per_second"] or 0, entry["total_seconds"]))
+    return results
+
+
+def compare(results, baseline):
+    # Prints the change in events/sec and total time for every case present in both runs.
+    previous = {(entry["distribution"], entry["sites"]): entry for entry in baseline["results"]}
+    for entry in results:
+        old = previous.get((entry["distribution"], entry["sites"]))
+        if old is None or not old["events_per_second"] or not entry["events_per_second"]:
+            continue
+        print("%-10s %8d sites  events/s x%.2f  total time x%.2f" % (
+            entry["distribution"], entry["sites"], entry["events_per_second"] / old["events_per_second"],
+            entry["total_seconds"] / old["total_seconds"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sweep, event queue and renderer.")
+    parser.add_argument("--distributions", default=",".join(DISTRIBUTIONS))
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--render-limit", type=int, default=10000, help="largest site count to render")
+    parser.add_argument("--memory-limit", type=int, default=1000000, help="largest site count to trace memory for")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="earlier output to compare against")
+    args = parser.parse_args()
+
+    results = run(args.distributions.split(","), [int(size) for size in args.sizes.split(",")], args.seed,
+                  args.frames, args.render_limit, args.memory_limit)
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
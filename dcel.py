@@ -0,0 +1,146 @@
+import numpy as np
+from fortune import FortuneSweep
+from geometry import box_exit, box_position
+
+
+def clip_polygon(polygon, bbox):
+    x0, y0, x1, y1 = bbox
+    for axis, bound, keep_above in ((0, x0, True), (0, x1, False), (1, y0, True), (1, y1, False)):
+        if len(polygon) == 0:
+            break
+        clipped = []
+        previous = polygon[-1]
+        previous_inside = (previous[axis] >= bound) == keep_above or previous[axis] == bound
+        for point in polygon:
+            inside = (point[axis] >= bound) == keep_above or point[axis] == bound
+            if inside != previous_inside:
+                t = (bound - previous[axis]) / (point[axis] - previous[axis])
+                crossing = [previous[0] + t * (point[0] - previous[0]), previous[1] + t * (point[1] - previous[1])]
+                crossing[axis] = bound
+                clipped.append(tuple(crossing))
+            if inside:
+                clipped.append(point)
+            previous = point
+            previous_inside = inside
+        polygon = clipped
+    return polygon
+
+
+class VoronoiDCEL:
+    # Half-edge view of a finished sweep. Half-edge h belongs to edge h >> 1, its twin is h ^ 1, it starts at
+    # vertex origin[h] and ends at vertex origin[h ^ 1] (-1 where the edge is unbounded).
+    def __init__(self, site_x, site_y, vertices, edge_sites, edge_origins, origin, half_next, half_prev):
+        self.site_x = site_x
+        self.site_y = site_y
+        self.vertices = vertices
+        self.edge_sites = edge_sites
+        self.edge_origins = edge_origins
+        self.origin = origin
+        self.next = half_next
+        self.prev = half_prev
+        self.site = edge_sites.reshape(-1)
+
+        order = np.argsort(self.site, kind="stable")
+        bounds = np.searchsorted(self.site[order], np.arange(len(site_x) + 1))
+        self.cell_half_edges = [order[bounds[site]:bounds[site + 1]] for site in range(len(site_x))]
+
+    @classmethod
+    def from_sweep(cls, sweep):
+        edge_nodes = np.array(sweep.edge_nodes, dtype=np.int32).reshape(-1, 2)
+        return cls(np.array(sweep.site_x), np.array(sweep.site_y),
+                   np.column_stack((np.array(sweep.vertex_x), np.array(sweep.vertex_y))).reshape(-1, 2),
+                   np.column_stack((np.array(sweep.edge_left), np.array(sweep.edge_right))).reshape(-1, 2),
+                   np.column_stack((np.array(sweep.edge_origin_x), np.array(sweep.edge_origin_y))).reshape(-1, 2),
+                   edge_nodes[:, ::-1].reshape(-1).copy(),
+                   np.array(sweep.half_next, dtype=np.int32), np.array(sweep.half_prev, dtype=np.int32))
+
+    def destination(self, half_edge):
+        return self.origin[half_edge ^ 1]
+
+    def direction(self, half_edge):
+        left, right = self.edge_sites[half_edge >> 1]
+        dx = self.site_y[left] - self.site_y[right]
+        dy = self.site_x[right] - self.site_x[left]
+        if half_edge & 1:
+            return -dx, -dy
+        return dx, dy
+
+    def outer_box(self, bbox):
+        # A box holding every vertex, site and edge origin, so that the boundary of each cell inside it is its
+        # half-edge chain closed along the box.
+        x = np.concatenate((self.site_x, self.vertices[:, 0], self.edge_origins[:, 0], bbox[0::2]))
+        y = np.concatenate((self.site_y, self.vertices[:, 1], self.edge_origins[:, 1], bbox[1::2]))
+        margin = max(x.max() - x.min(), y.max() - y.min(), 1.0)
+        return x.min() - margin, y.min() - margin, x.max() + margin, y.max() + margin
+
+    def chain(self, half_edge, box):
+        points = []
+        origin = self.origin[half_edge]
+        if origin < 0:
+            dx, dy = self.direction(half_edge)
+            destination = self.destination(half_edge)
+            x, y = self.vertices[destination] if destination >= 0 else self.edge_origins[half_edge >> 1]
+            points.append(box_exit(x, y, -dx, -dy, box))
+        while True:
+            destination = self.destination(half_edge)
+            if destination < 0:
+                dx, dy = self.direction(half_edge)
+                origin = self.origin[half_edge]
+                x, y = self.vertices[origin] if origin >= 0 else self.edge_origins[half_edge >> 1]
+                points.append(box_exit(x, y, dx, dy, box))
+                return points
+            points.append(tuple(self.vertices[destination]))
+            half_edge = self.next[half_edge]
+
+    def cell_polygon(self, site, bbox, box=None):
+        if box is None:
+            box = self.outer_box(bbox)
+        half_edges = self.cell_half_edges[site]
+        if len(half_edges) == 0:
+            # Without edges every site stands on one point, and its first copy owns the whole plane; later copies
+            # of a site were dropped by the sweep and have no cell.
+            same = (self.site_x == self.site_x[site]) & (self.site_y == self.site_y[site])
+            if len(self.edge_sites) == 0 and np.argmax(same) == site:
+                return np.array([(bbox[0], bbox[1]), (bbox[2], bbox[1]), (bbox[2], bbox[3]), (bbox[0], bbox[3])])
+            return np.empty((0, 2))
+
+        starts = [half_edge for half_edge in half_edges.tolist() if self.origin[half_edge] < 0]
+        if len(starts) == 0:
+            polygon = []
+            half_edge = first = int(half_edges[0])
+            while True:
+                polygon.append(tuple(self.vertices[self.origin[half_edge]]))
+                half_edge = self.next[half_edge]
+                if half_edge == first:
+                    break
+        else:
+            # An unbounded cell is one or two open chains; each is closed by walking the outer box forwards to
+            # the start of the next chain, picking up the corners passed on the way.
+            chains = [self.chain(half_edge, box) for half_edge in starts]
+            perimeter = 2 * (box[2] - box[0]) + 2 * (box[3] - box[1])
+            corners = [(0, (box[0], box[1])), (box[2] - box[0], (box[2], box[1])),
+                       (box[2] - box[0] + box[3] - box[1], (box[2], box[3])),
+                       (2 * (box[2] - box[0]) + box[3] - box[1], (box[0], box[3]))]
+            starts_at = [box_position(*chain[0], box) for chain in chains]
+            polygon = []
+            chain = 0
+            for _ in chains:
+                polygon.extend(chains[chain])
+                end_at = box_position(*chains[chain][-1], box)
+                gaps = [(start_at - end_at) % perimeter for start_at in starts_at]
+                chain = int(np.argmin(gaps))
+                for position, corner in sorted(corners, key=lambda corner: (corner[0] - end_at) % perimeter):
+                    if 0 < (position - end_at) % perimeter < gaps[chain]:
+                        polygon.append(corner)
+
+        return np.array(clip_polygon(polygon, bbox)).reshape(-1, 2)
+
+    def cell_polygons(self, bbox):
+        box = self.outer_box(bbox)
+        return [self.cell_polygon(site, bbox, box) for site in range(len(self.site_x))]
+
+
+def compute_voronoi_cells(points, bbox):
+    sweep = FortuneSweep(points)
+    sweep.run_all()
+    return VoronoiDCEL.from_sweep(sweep).cell_polygons(bbox)
@@ -0,0 +1,115 @@
+import heapq
+
+
+def run_position(site_x, site_y, run, key):
+    # How many entries of a run, sorted by (y, x, site), come at or before `key`, by binary search.
+    lo = 0
+    hi = len(run)
+    while lo < hi:
+        middle = (lo + hi) // 2
+        site = int(run[middle])
+        if (site_y[site], site_x[site], site) <= key:
+            lo = middle + 1
+        else:
+            hi = middle
+    return lo
+
+
+def merge_site_runs(site_x, site_y, runs, block_size=4096, after=None):
+    # Lazily merges runs of site indices, each already sorted by (y, x), into one (y, x, site) stream. Indices are
+    # turned into Python ints a block at a time, so no per-site object outlives the step that consumes it. With
+    # `after`, a (y, x, site) entry, the stream resumes past it.
+    def run_entries(run):
+        first = 0 if after is None else run_position(site_x, site_y, run, after)
+        for start in range(first, len(run), block_size):
+            for site in run[start:start + block_size].tolist():
+                yield site_y[site], site_x[site], site
+
+    return heapq.merge(*(run_entries(run) for run in runs))
+
+
+class EventQueue:
+    # Min-heap on (y, x) for circle events, merged with a stream of (y, x, site) entries already sorted the same
+    # way; a site event object is only built once its site reaches the front. Cancelled events stay in the heap as
+    # tombstones and are dropped when they reach the top.
+    def __init__(self, sites=(), site_count=0, site_event=None):
+        self.pushed = 0
+        self.heap = []
+        self.sites = iter(sites)
+        self.site_event = site_event
+        self.next_site = None
+        self.pending_sites = site_count
+        self.live = 0
+        self.stale = 0
+        self.skipped = 0
+
+    def __len__(self):
+        return self.live + self.pending_sites
+
+    def reset(self, sites, site_count, circle_events=(), pushed=0):
+        # Puts the queue back to an earlier state, for restoring a sweep: a new site stream with `site_count`
+        # sites left in it, and the (order, event) pairs of the circle events pending then, with the push order
+        # they had, so that ties between them break as before.
+        self.heap = [(event.y, event.x, order, event) for order, event in circle_events]
+        heapq.heapify(self.heap)
+        self.pushed = pushed
+        self.sites = iter(sites)
+        self.next_site = None
+        self.pending_sites = site_count
+        self.live = len(self.heap)
+        self.stale = 0
+
+    def pending_circle_events(self):
+        # The (order, event) pairs of the valid circle events, for a checkpoint.
+        return [(entry[2], entry[3]) for entry in self.heap if entry[3].is_valid]
+
+    def __iter__(self):
+        # Only circle events are held as objects; pending sites are still entries in the stream.
+        for entry in self.heap:
+            if entry[3].is_valid:
+                yield entry[3]
+
+    def push(self, event):
+        heapq.heappush(self.heap, (event.y, event.x, self.pushed, event))
+        self.pushed += 1
+        self.live += 1
+
+    def invalidate(self, event):
+        if event.is_valid:
+            event.is_valid = False
+            self.live -= 1
+            self.stale += 1
+
+    def discard_stale(self):
+        while len(self.heap) > 0 and not self.heap[0][3].is_valid:
+            heapq.heappop(self.heap)
+            self.stale -= 1
+            self.skipped += 1
+
+    def peek_site(self):
+        if self.next_site is None and self.pending_sites > 0:
+            y, x, site = next(self.sites)
+            self.next_site = self.site_event(site, x, y)
+        return self.next_site
+
+    def peek(self):
+        self.discard_stale()
+        site_event = self.peek_site()
+        if len(self.heap) == 0:
+            return site_event
+        # A site wins a tie with a circle event at the same point.
+        if site_event is not None and (site_event.y, site_event.x) <= self.heap[0][:2]:
+            return site_event
+        return self.heap[0][3]
+
+    def pop(self):
+        event = self.peek()
+        if event is None:
+            return None
+        if event is self.next_site:
+            self.next_site = None
+            self.pending_sites -= 1
+        else:
+            heapq.heappop(self.heap)
+            self.live -= 1
+        return event
@@ -0,0 +1,644 @@
+import math
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from time import perf_counter
+import numpy as np
+from beachline import BeachLine
+from event_queue import EventQueue, merge_site_runs
+from predicates import circumcircle_exact, incircle, orientation
+
+# triangles holds the Delaunay triangle behind each vertex, as the (left, middle, right) sites of its circle event,
+# followed by the extra triangles of vertices shared by more than three co-circular sites; indptr/indices are the
+# site graph in CSR form, and neighbors the same graph as lists.
+VoronoiResult = namedtuple("VoronoiResult", ["vertices", "edges", "neighbors", "triangles", "indptr", "indices"])
+
+
+def parabola_y(site_x, site_y, sweep_y, x):
+    return (sweep_y + site_y) / 2 - (x - site_x) * (x - site_x) / (2 * (sweep_y - site_y))
+
+
+def breakpoint_x(left_x, left_y, right_x, right_y, sweep_y):
+    if left_y == right_y:
+        return (left_x + right_x) / 2
+
+    d_left = sweep_y - left_y
+    d_right = sweep_y - right_y
+    if d_left == 0:
+        return left_x
+    if d_right == 0:
+        return right_x
+
+    # Roots of d_left * (x - right_x)^2 - d_right * (x - left_x)^2 + d_left * d_right * (left_y - right_y),
+    # taken relative to left_x and picked so that the left parabola is on top to the left of the breakpoint.
+    # d_left - d_right, taken from the site ys: far below two sites that nearly share a y the difference of the
+    # distances can round to zero although the sites differ.
+    a = right_y - left_y
+    dx = right_x - left_x
+    s = math.sqrt(d_left * d_right * (dx * dx + a * a))
+    if dx < 0:
+        return left_x + (d_left * dx - s) / a
+    return left_x + d_left * (dx * dx - a * d_right) / (d_left * dx + s)
+
+
+def circumcircle(x1, y1, x2, y2, x3, y3):
+    bx = x2 - x1
+    by = y2 - y1
+    cx = x3 - x1
+    cy = y3 - y1
+    d = 2 * (bx * cy - by * cx)
+    if d == 0:
+        return None
+    b2 = bx * bx + by * by
+    c2 = cx * cx + cy * cy
+    ux = (cy * b2 - by * c2) / d
+    uy = (bx * c2 - cx * b2) / d
+    return x1 + ux, y1 + uy, math.hypot(ux, uy)
+
+
+class SiteEvent:
+    __slots__ = ("site", "x", "y")
+
+    def __init__(self, site, x, y):
+        self.site = site
+        self.x = x
+        self.y = y
+
+
+class CircleEvent:
+    __slots__ = ("parabolic_arc", "is_valid", "cx", "cy", "cr", "x", "y")
+
+    def __init__(self, parabolic_arc, cx, cy, cr):
+        self.parabolic_arc = parabolic_arc
+        self.is_valid = True
+        self.cx = cx
+        self.cy = cy
+        self.cr = cr
+        self.x = cx
+        self.y = cy + cr
+
+
+class Breakpoint:
+    __slots__ = ("left_site", "right_site", "edge", "end")
+
+    def __init__(self, left_site, right_site, edge, end):
+        self.left_site = left_site
+        self.right_site = right_site
+        self.edge = edge
+        self.end = end
+
+
+class ParabolicArc:
+    __slots__ = ("site", "left_arc", "right_arc", "left_breakpoint", "right_breakpoint", "circle_event",
+                 "tree_parent", "tree_left", "tree_right", "red")
+
+    def __init__(self, site):
+        self.site = site
+        self.left_arc = None
+        self.right_arc = None
+        self.left_breakpoint = None
+        self.right_breakpoint = None
+        self.circle_event = None
+        self.tree_parent = None
+        self.tree_left = None
+        self.tree_right = None
+        self.red = False
+
+
+class SweepCheckpoint:
+    # What a sweep needs, besides its append-only output, to be put back to the moment after `processed` events:
+    # the lengths of the output arrays and of the undo journal, the beach line as the site of every arc and the
+    # (edge, end) of every breakpoint between them, and the pending circle events as the arc they belong to, their
+    # push order and their circle.
+    __slots__ = ("processed", "event_y", "last_site", "pending_sites", "pushed", "recent_y", "recent_vertices",
+                 "vertex_count", "extra_count", "edge_count", "journal_length", "arc_sites", "breakpoint_ends",
+                 "circle_arcs", "circle_orders", "circles")
+
+    def __init__(self, sweep):
+        self.processed = sweep.processed
+        self.event_y = sweep.event_y
+        self.last_site = sweep.last_site
+        self.pending_sites = sweep.events.pending_sites
+        self.pushed = sweep.events.pushed
+        self.recent_y = sweep.recent_y
+        self.recent_vertices = {column: list(nodes) for column, nodes in sweep.recent_vertices.items()}
+        self.vertex_count = len(sweep.vertex_x)
+        self.extra_count = len(sweep.extra_nodes)
+        self.edge_count = len(sweep.edge_left)
+        self.journal_length = len(sweep.journal)
+        self.arc_sites = array("i")
+        self.breakpoint_ends = array("i")
+        position = {}
+        for parabolic_arc in sweep.beach_line:
+            position[id(parabolic_arc)] = len(self.arc_sites)
+            self.arc_sites.append(parabolic_arc.site)
+            if parabolic_arc.right_breakpoint is not None:
+                self.breakpoint_ends.extend((parabolic_arc.right_breakpoint.edge, parabolic_arc.right_breakpoint.end))
+        self.circle_arcs = array("i")
+        self.circle_orders = array("q")
+        self.circles = array("d")
+        for order, event in sweep.events.pending_circle_events():
+            self.circle_arcs.append(position[id(event.parabolic_arc)])
+            self.circle_orders.append(order)
+            self.circles.extend((event.cx, event.cy, event.cr))
+
+
+class FortuneSweep:
+    def __init__(self, points=(), chunks=None, sink=None, stats=None, hook=None, checkpoint_every=None):
+        # Sites come either as an iterable of (x, y) pairs or as `chunks`, an iterable of (k, 2) arrays such as the
+        # loaders in loaders.py yield. Each chunk is copied into the site arrays and sorted on its own; the sorted
+        # runs are merged lazily as the sweep consumes them, so loading never builds one object per site.
+        # A `sink` (see writers.py) is handed every vertex as it is found and every edge once both of its ends
+        # are fixed; edges left unbounded are handed over when the queue runs dry. Such a sweep keeps nothing it
+        # has handed over, so result() has nothing to return. With `stats` (a stats.SweepStats)
+        # every step is counted and timed, and `hook(sweep, event)` is called after each one. With
+        # `checkpoint_every`, a checkpoint is kept every that many events, and seek() can move the sweep back.
+        if chunks is None:
+            chunks = (np.array(list(points), dtype=np.float64).reshape(-1, 2),)
+        self.site_x = array("d")
+        self.site_y = array("d")
+        runs = []
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, 2)
+            runs.append(np.lexsort((chunk[:, 0], chunk[:, 1])) + len(self.site_x))
+            self.site_x.frombytes(np.ascontiguousarray(chunk[:, 0]).tobytes())
+            self.site_y.frombytes(np.ascontiguousarray(chunk[:, 1]).tobytes())
+        self.site_runs = runs
+        self.sweep_y = -math.inf
+        self.event_y = -math.inf
+        self.processed = 0
+        self.events = EventQueue(merge_site_runs(self.site_x, self.site_y, runs), len(self.site_x), SiteEvent)
+        self.beach_line = BeachLine()
+        self.vertex_x = array("d")
+        self.vertex_y = array("d")
+        # The (left, middle, right) arcs whose circle event produced each vertex, three entries per vertex.
+        self.vertex_sites = array("i")
+        # Triples of circle events that landed on an existing vertex because four or more sites share its circle,
+        # and that vertex for each.
+        self.extra_triangles = array("i")
+        self.extra_nodes = array("i")
+        self.recent_vertices = {}
+        self.recent_y = -math.inf
+        # The (y, x, site) of the last site event. Sites come off the queue sorted by (y, x), so a repeated site
+        # follows its first copy and is dropped there.
+        self.last_site = None
+
+        # Edges are records spread over typed arrays: the sites on either side, a point the edge passes through
+        # and a vertex index per end. End 0 is the one a breakpoint between (left, right) runs towards, end 1 the
+        # opposite one; an end stays -1 while it is still traced, or for good if the edge is unbounded there.
+        self.edge_left = array("i")
+        self.edge_right = array("i")
+        self.edge_origin_x = array("d")
+        self.edge_origin_y = array("d")
+        self.edge_nodes = array("i")
+
+        # Each edge e has two half-edges: 2e bounds the cell of edge_left[e] and runs from end 1 to end 0, 2e + 1
+        # bounds the cell of edge_right[e] and runs the other way, so every cell is walked with positive signed area.
+        # half_next/half_prev link consecutive half-edges around a cell and are filled in at circle events.
+        self.half_next = array("i")
+        self.half_prev = array("i")
+
+        # With a sink, the arrays above stay empty: vertices and edges are only numbered, and each edge lives in
+        # `traced` as [left, right, origin_x, origin_y, node0, node1, x0, y0, x1, y1], with the point of each
+        # fixed end, from the event that opens it until it is handed over.
+        self.traced = None
+        self.vertex_count = 0
+        self.edge_count = 0
+        if sink is not None:
+            self.traced = {}
+        self.version = 0
+        self.sink = sink
+        if sink is not None:
+            sink.open(self)
+        self.stats = stats
+        self.hook = hook
+        # Breakpoint positions computed by BeachLine.find, counted only while `stats` is attached.
+        self.breakpoint_evaluations = 0
+
+        # Everything above only grows, except edge ends and half-edge links, which are filled in once each. While
+        # checkpoints are kept, every such write is journaled as the pair (3 * index + (0 for edge_nodes, 1 for
+        # half_next, 2 for half_prev), value), so that going back is truncating the arrays and clearing the
+        # journaled entries. What going back cuts off is kept in `ahead`, as appended and with its journal, so that
+        # going forward again to a checkpoint already passed is copying it back rather than replaying the events.
+        self.checkpoint_every = checkpoint_every
+        self.journal = None
+        self.checkpoints = None
+        self.ahead = None
+        self.ahead_base = None
+        if checkpoint_every is not None:
+            if sink is not None:
+                raise ValueError("a sweep writing to a sink cannot keep checkpoints")
+            self.journal = array("q")
+            self.checkpoints = [SweepCheckpoint(self)]
+            self.checkpoint_y = [self.event_y]
+
+    def has_events(self):
+        return len(self.events) > 0
+
+    def peek_event(self):
+        return self.events.peek()
+
+    def step_event(self):
+        if self.stats is not None or self.hook is not None:
+            return self.instrumented_step()
+        return self.process_event()
+
+    def instrumented_step(self):
+        stats = self.stats
+        skipped = self.events.skipped
+        evaluations = self.breakpoint_evaluations
+        start = perf_counter()
+        event = self.process_event()
+        if event is None:
+            return None
+        if stats is not None:
+            stats.record_step(isinstance(event, SiteEvent), perf_counter() - start, self.events.skipped - skipped,
+                              self.breakpoint_evaluations - evaluations, len(self.beach_line), self.sweep_y)
+        if self.hook is not None:
+            self.hook(self, event)
+        return event
+
+    def process_event(self):
+        event = self.events.pop()
+        if event is None:
+            if self.sink is not None:
+                self.emit_open_edges()
+                self.sink = None
+            return None
+
+        self.sweep_y = self.event_y = event.y
+        self.version += 1
+        if isinstance(event, SiteEvent):
+            self.handle_site_event(event)
+        else:
+            self.handle_circle_event(event)
+        self.processed += 1
+        if self.checkpoints is not None and self.processed % self.checkpoint_every == 0:
+            if self.processed > self.checkpoints[-1].processed:
+                self.checkpoints.append(SweepCheckpoint(self))
+                self.checkpoint_y.append(self.event_y)
+        return event
+
+    def run_until(self, y):
+        processed = 0
+        event = self.events.peek()
+        while event is not None and event.y < y:
+            self.step_event()
+            processed += 1
+            event = self.events.peek()
+        self.sweep_y = max(self.sweep_y, y)
+        return processed
+
+    def run_all(self):
+        processed = 0
+        while self.step_event() is not None:
+            processed += 1
+        return processed
+
+    def seek(self, y):
+        # Leaves the sweep as run_until(y) would from the start: every event above y processed, none at or below
+        # it. Going back, or forward past a checkpoint, restores the last checkpoint above y and replays the
+        # events between it and y, at most checkpoint_every of them.
+        if self.checkpoints is None:
+            raise ValueError("seek needs a sweep created with checkpoint_every")
+        checkpoint = self.checkpoints[bisect_left(self.checkpoint_y, y) - 1]
+        if self.event_y >= y or checkpoint.processed > self.processed:
+            self.restore(checkpoint)
+        self.run_until(y)
+        self.sweep_y = y
+
+    def output_arrays(self):
+        return (self.vertex_x, self.vertex_y, self.vertex_sites, self.extra_triangles, self.extra_nodes,
+                self.edge_left, self.edge_right, self.edge_origin_x, self.edge_origin_y, self.edge_nodes,
+                self.half_next, self.half_prev, self.journal)
+
+    def restore(self, checkpoint):
+        targets = (self.edge_nodes, self.half_next, self.half_prev)
+        arrays = self.output_arrays()
+        current = [len(values) for values in arrays]
+        lengths = [checkpoint.vertex_count, checkpoint.vertex_count, 3 * checkpoint.vertex_count,
+                   3 * checkpoint.extra_count, checkpoint.extra_count] + [checkpoint.edge_count] * 4
+        lengths += [2 * checkpoint.edge_count] * 3
+        lengths.append(checkpoint.journal_length)
+        # Site events journal nothing, so the event count, not the journal length, tells back from forward.
+        if checkpoint.processed <= self.processed:
+            journal = self.journal[checkpoint.journal_length:].tolist()
+            for i in range(0, len(journal), 2):
+                targets[journal[i] % 3][journal[i] // 3] = -1
+            ahead = [values[length:] for values, length in zip(arrays, lengths)]
+            if self.ahead is not None:
+                for tail, stash, count, base in zip(ahead, self.ahead, current, self.ahead_base):
+                    tail.extend(stash[count - base:])
+            for values, length in zip(arrays, lengths):
+                del values[length:]
+            self.ahead = ahead
+            self.ahead_base = lengths
+        else:
+            for values, stash, count, length, base in zip(arrays, self.ahead, current, lengths, self.ahead_base):
+                if values is not self.journal:
+                    values.extend(stash[count - base:length - base])
+            journal = self.ahead[-1][current[-1] - self.ahead_base[-1]:lengths[-1] - self.ahead_base[-1]]
+            entries = journal.tolist()
+            for i in range(0, len(entries), 2):
+                targets[entries[i] % 3][entries[i] // 3] = entries[i + 1]
+            self.journal.extend(journal)
+
+        parabolic_arcs = [ParabolicArc(site) for site in checkpoint.arc_sites]
+        ends = checkpoint.breakpoint_ends
+        for i in range(len(parabolic_arcs) - 1):
+            left_arc = parabolic_arcs[i]
+            right_arc = parabolic_arcs[i + 1]
+            breakpoint = Breakpoint(left_arc.site, right_arc.site, ends[2 * i], ends[2 * i + 1])
+            left_arc.right_breakpoint = breakpoint
+            right_arc.left_breakpoint = breakpoint
+        self.beach_line.build(parabolic_arcs)
+
+        circle_events = []
+        circles = checkpoint.circles
+        for i, (arc, order) in enumerate(zip(checkpoint.circle_arcs, checkpoint.circle_orders)):
+            parabolic_arc = parabolic_arcs[arc]
+            parabolic_arc.circle_event = CircleEvent(parabolic_arc, circles[3 * i], circles[3 * i + 1], circles[3 * i + 2])
+            circle_events.append((order, parabolic_arc.circle_event))
+        sites = merge_site_runs(self.site_x, self.site_y, self.site_runs, after=checkpoint.last_site)
+        self.events.reset(sites, checkpoint.pending_sites, circle_events, checkpoint.pushed)
+
+        self.processed = checkpoint.processed
+        self.sweep_y = self.event_y = checkpoint.event_y
+        self.last_site = checkpoint.last_site
+        self.recent_y = checkpoint.recent_y
+        self.recent_vertices = {column: list(nodes) for column, nodes in checkpoint.recent_vertices.items()}
+        self.version += 1
+
+    def parabolic_arcs(self):
+        return iter(self.beach_line)
+
+    def breakpoint_position(self, breakpoint, sweep_y=None):
+        if sweep_y is None:
+            sweep_y = self.sweep_y
+        left_x = self.site_x[breakpoint.left_site]
+        left_y = self.site_y[breakpoint.left_site]
+        right_x = self.site_x[breakpoint.right_site]
+        right_y = self.site_y[breakpoint.right_site]
+        x = breakpoint_x(left_x, left_y, right_x, right_y, sweep_y)
+        if left_y < right_y:
+            return x, parabola_y(left_x, left_y, sweep_y, x)
+        if right_y < sweep_y:
+            return x, parabola_y(right_x, right_y, sweep_y, x)
+        return x, -math.inf
+
+    def current_breakpoint_x(self, breakpoint):
+        left_x = self.site_x[breakpoint.left_site]
+        left_y = self.site_y[breakpoint.left_site]
+        right_x = self.site_x[breakpoint.right_site]
+        right_y = self.site_y[breakpoint.right_site]
+        return breakpoint_x(left_x, left_y, right_x, right_y, self.sweep_y)
+
+    def counted_breakpoint_x(self, breakpoint):
+        self.breakpoint_evaluations += 1
+        return self.current_breakpoint_x(breakpoint)
+
+    def find_arc_above(self, x):
+        if self.stats is not None:
+            return self.beach_line.find(x, self.counted_breakpoint_x)
+        return self.beach_line.find(x, self.current_breakpoint_x)
+
+    def add_edge(self, left_site, right_site, origin_x, origin_y):
+        if self.traced is not None:
+            self.edge_count += 1
+            self.traced[self.edge_count - 1] = [left_site, right_site, origin_x, origin_y, -1, -1, 0.0, 0.0, 0.0, 0.0]
+            return self.edge_count - 1
+        self.edge_left.append(left_site)
+        self.edge_right.append(right_site)
+        self.edge_origin_x.append(origin_x)
+        self.edge_origin_y.append(origin_y)
+        self.edge_nodes.append(-1)
+        self.edge_nodes.append(-1)
+        self.half_next.extend((-1, -1))
+        self.half_prev.extend((-1, -1))
+        return len(self.edge_left) - 1
+
+    def next_vertex(self):
+        return self.vertex_count if self.traced is not None else len(self.vertex_x)
+
+    def fix_end(self, edge, end, node, x, y):
+        if self.traced is not None:
+            record = self.traced[edge]
+            record[4 + end] = node
+            record[6 + 2 * end] = x
+            record[7 + 2 * end] = y
+            return
+        self.edge_nodes[2 * edge + end] = node
+        if self.journal is not None:
+            self.journal.extend((3 * (2 * edge + end), node))
+
+    def half_edge(self, edge, site):
+        return 2 * edge + (self.edge_left[edge] != site)
+
+    def link_half_edges(self, half_edge, next_half_edge):
+        self.half_next[half_edge] = next_half_edge
+        self.half_prev[next_half_edge] = half_edge
+        if self.journal is not None:
+            self.journal.extend((3 * half_edge + 1, next_half_edge, 3 * next_half_edge + 2, half_edge))
+
+    def emit_edges(self, *edges):
+        # Edges between two co-circular events at one vertex have both ends on it and are never handed over. The
+        # record of an edge stays in `traced` while the sink looks at it.
+        for edge in edges:
+            left, right, origin_x, origin_y, node0, node1 = self.traced[edge][:6]
+            if node0 >= 0 and node1 >= 0:
+                if node0 != node1:
+                    self.sink.edge(edge, left, right, node0, node1)
+                del self.traced[edge]
+
+    def emit_open_edges(self):
+        # Records were added in edge order and only ever removed since, so the rest come out in edge order too.
+        for edge, record in self.traced.items():
+            left, right, origin_x, origin_y, node0, node1 = record[:6]
+            self.sink.edge(edge, left, right, node0, node1)
+        self.traced.clear()
+
+    def invalidate_circle_event(self, parabolic_arc):
+        if parabolic_arc.circle_event is not None:
+            self.events.invalidate(parabolic_arc.circle_event)
+            parabolic_arc.circle_event = None
+
+    def try_add_circle_events(self, parabolic_arcs):
+        # Every event produces at most two candidate triples, too few for the NumPy batch in
+        # vectorized.circumcircles to pay off, so they are screened here with its scalar twin.
+        site_x = self.site_x
+        site_y = self.site_y
+        for parabolic_arc in parabolic_arcs:
+            left_arc = parabolic_arc.left_arc
+            right_arc = parabolic_arc.right_arc
+            if left_arc is None or right_arc is None or left_arc.site == right_arc.site:
+                continue
+
+            x1 = site_x[left_arc.site]
+            y1 = site_y[left_arc.site]
+            x2 = site_x[parabolic_arc.site]
+            y2 = site_y[parabolic_arc.site]
+            x3 = site_x[right_arc.site]
+            y3 = site_y[right_arc.site]
+            if orientation(x1, y1, x2, y2, x3, y3) <= 0:
+                continue
+
+            circle = circumcircle(x1, y1, x2, y2, x3, y3)
+            if circle is None:
+                # The filtered orientation is exact, so the sites do turn; only the float determinant vanished.
+                circle = circumcircle_exact(x1, y1, x2, y2, x3, y3)
+                if circle is None:
+                    continue
+
+            circle_event = CircleEvent(parabolic_arc, *circle)
+            parabolic_arc.circle_event = circle_event
+            self.events.push(circle_event)
+
+    def handle_site_event(self, event):
+        last_site = self.last_site
+        self.last_site = (event.y, event.x, event.site)
+        if last_site is not None and last_site[0] == event.y and last_site[1] == event.x:
+            return
+        if len(self.beach_line) == 0:
+            self.beach_line.insert_first(ParabolicArc(event.site))
+            return
+
+        parabolic_arc = self.find_arc_above(event.x)
+        arc_x = self.site_x[parabolic_arc.site]
+        arc_y = self.site_y[parabolic_arc.site]
+
+        # Sites sharing the lowest y never split an arc: each one opens a new arc to the right of the last.
+        if arc_y == event.y:
+            new_arc = ParabolicArc(event.site)
+            edge = self.add_edge(parabolic_arc.site, event.site, (arc_x + event.x) / 2, event.y)
+            breakpoint = Breakpoint(parabolic_arc.site, event.site, edge, 0)
+            parabolic_arc.right_breakpoint = breakpoint
+            new_arc.left_breakpoint = breakpoint
+            self.beach_line.insert_after(parabolic_arc, new_arc)
+            return
+
+        self.invalidate_circle_event(parabolic_arc)
+
+        edge = self.add_edge(parabolic_arc.site, event.site, event.x, parabola_y(arc_x, arc_y, event.y, event.x))
+        left_breakpoint = Breakpoint(parabolic_arc.site, event.site, edge, 0)
+        right_breakpoint = Breakpoint(event.site, parabolic_arc.site, edge, 1)
+
+        middle_arc = ParabolicArc(event.site)
+        right_arc = ParabolicArc(parabolic_arc.site)
+
+        middle_arc.left_breakpoint = left_breakpoint
+        middle_arc.right_breakpoint = right_breakpoint
+        right_arc.left_breakpoint = right_breakpoint
+        right_arc.right_breakpoint = parabolic_arc.right_breakpoint
+        parabolic_arc.right_breakpoint = left_breakpoint
+
+        self.beach_line.insert_after(parabolic_arc, middle_arc)
+        self.beach_line.insert_after(middle_arc, right_arc)
+
+        self.try_add_circle_events((parabolic_arc, right_arc))
+
+    def shared_vertex(self, event, sites):
+        # The vertex already standing where this circle event lands, or -1. With four or more sites on one circle
+        # the events of their arcs all fire at one point, one after the other; rounding can spread their keys by a
+        # few ulps, so the vertices placed since the key last moved by more than that, bucketed by x, are the
+        # candidates, and one is reused when the new sites lie exactly on its circle.
+        tolerance = 1e-9 * (abs(event.cx) + abs(event.cy) + event.cr + 1)
+        if event.y - self.recent_y > tolerance:
+            self.recent_vertices.clear()
+        self.recent_y = event.y
+        column = math.floor(event.cx / tolerance)
+        site_x = self.site_x
+        site_y = self.site_y
+        for key in (column - 1, column, column + 1):
+            for node, a, b, c in self.recent_vertices.get(key, ()):
+                if all(incircle(site_x[a], site_y[a], site_x[b], site_y[b], site_x[c], site_y[c], site_x[s], site_y[s]) == 0
+                       for s in sites if s not in (a, b, c)):
+                    return node
+        self.recent_vertices.setdefault(column, []).append((self.next_vertex(),) + sites)
+        return -1
+
+    def handle_circle_event(self, event):
+        parabolic_arc = event.parabolic_arc
+        left_arc = parabolic_arc.left_arc
+        right_arc = parabolic_arc.right_arc
+        parabolic_arc.circle_event = None
+
+        sites = (left_arc.site, parabolic_arc.site, right_arc.site)
+        node = self.shared_vertex(event, sites)
+        shared = node >= 0
+        if self.traced is not None:
+            if not shared:
+                node = self.vertex_count
+                self.vertex_count += 1
+                self.sink.vertex(node, event.cx, event.cy)
+        elif shared:
+            self.extra_triangles.extend(sites)
+            self.extra_nodes.append(node)
+        else:
+            node = len(self.vertex_x)
+            self.vertex_x.append(event.cx)
+            self.vertex_y.append(event.cy)
+            self.vertex_sites.extend(sites)
+        for breakpoint in (parabolic_arc.left_breakpoint, parabolic_arc.right_breakpoint):
+            self.fix_end(breakpoint.edge, breakpoint.end, node, event.cx, event.cy)
+        if self.traced is not None:
+            self.emit_edges(parabolic_arc.left_breakpoint.edge, parabolic_arc.right_breakpoint.edge)
+
+        self.invalidate_circle_event(left_arc)
+        self.invalidate_circle_event(right_arc)
+
+        edge = self.add_edge(left_arc.site, right_arc.site, event.cx, event.cy)
+        if self.traced is not None:
+            self.fix_end(edge, 1, node, event.cx, event.cy)
+        else:
+            self.edge_nodes[2 * edge + 1] = node
+        breakpoint = Breakpoint(left_arc.site, right_arc.site, edge, 0)
+
+        self.beach_line.remove(parabolic_arc)
+        left_arc.right_breakpoint = breakpoint
+        right_arc.left_breakpoint = breakpoint
+
+        # The vanishing cell closes at the vertex, and the new edge continues the boundaries of its two neighbours.
+        if self.traced is None:
+            left_edge = parabolic_arc.left_breakpoint.edge
+            right_edge = parabolic_arc.right_breakpoint.edge
+            self.link_half_edges(self.half_edge(right_edge, parabolic_arc.site), self.half_edge(left_edge, parabolic_arc.site))
+            self.link_half_edges(self.half_edge(left_edge, left_arc.site), self.half_edge(edge, left_arc.site))
+            self.link_half_edges(self.half_edge(edge, right_arc.site), self.half_edge(right_edge, right_arc.site))
+
+        self.try_add_circle_events((left_arc, right_arc))
+
+    def result(self):
+        vertices = np.column_stack((np.array(self.vertex_x), np.array(self.vertex_y))).reshape(-1, 2)
+        nodes = np.array(self.edge_nodes, dtype=np.int32).reshape(-1, 2)
+        edges = np.column_stack((np.array(self.edge_left), np.array(self.edge_right), nodes)).reshape(-1, 4)
+        edges = edges[proper_edges(edges)]
+        return voronoi_result(vertices, edges, self.delaunay_triangles(), len(self.site_x))
+
+    def delaunay_triangles(self):
+        return np.array(self.vertex_sites + self.extra_triangles, dtype=np.int32).reshape(-1, 3)
+
+
+def proper_edges(edges):
+    # Which of the (left, right, node0, node1) edges join two different vertices or are open at an end; sites on
+    # one circle leave edges of length zero between the triangles that share its vertex.
+    return (edges[:, 2] != edges[:, 3]) | (edges[:, 2] < 0)
+
+
+def site_adjacency(edges, site_count):
+    # CSR form of the site graph: the neighbours of site s are indices[indptr[s]:indptr[s + 1]], sorted.
+    pairs = edges[:, :2].astype(np.int64)
+    keys = np.unique(np.concatenate((pairs[:, 0] * site_count + pairs[:, 1], pairs[:, 1] * site_count + pairs[:, 0])))
+    indptr = np.searchsorted(keys, np.arange(site_count + 1) * site_count)
+    return indptr.astype(np.int32), (keys % max(site_count, 1)).astype(np.int32)
+
+
+def voronoi_result(vertices, edges, triangles, site_count):
+    indptr, indices = site_adjacency(edges, site_count)
+    neighbors = [sites.tolist() for sites in np.split(indices, indptr[1:-1])][:site_count]
+    return VoronoiResult(vertices, edges, neighbors, triangles, indptr, indices)
+
+
+def compute_voronoi(points):
+    sweep = FortuneSweep(points)
+    sweep.run_all()
+    return sweep.result()
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def box_position(x, y, box):
+    # Distance travelled along the box boundary from its (x0, y0) corner, in the positive direction
+    # (x0, y0) -> (x1, y0) -> (x1, y1) -> (x0, y1), for a point or for arrays of them. A point off the boundary
+    # is taken to the side it is nearest.
+    x0, y0, x1, y1 = box
+    width = x1 - x0
+    height = y1 - y0
+    side = np.argmin(np.stack((abs(y - y0), abs(x - x1), abs(y - y1), abs(x - x0))), axis=0)
+    return np.choose(side, (x - x0, width + (y - y0), width + height + (x1 - x), 2 * width + height + (y1 - y)))
+
+
+def box_exit(x, y, dx, dy, box):
+    x0, y0, x1, y1 = box
+    t = np.inf
+    if dx > 0:
+        t = min(t, (x1 - x) / dx)
+    elif dx < 0:
+        t = min(t, (x0 - x) / dx)
+    if dy > 0:
+        t = min(t, (y1 - y) / dy)
+    elif dy < 0:
+        t = min(t, (y0 - y) / dy)
+    return x + t * dx, y + t * dy
+
+
+def clip_lines(px, py, dx, dy, t0, t1, box):
+    # Liang-Barsky on the lines p + t d, t in [t0, t1] (either bound may be infinite), all at once; returns the
+    # clipped parameter range, with t0 >= t1 where a line misses the box.
+    x0, y0, x1, y1 = box
+    t0 = t0.copy()
+    t1 = t1.copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, px - x0), (dx, x1 - px), (-dy, py - y0), (dy, y1 - py)):
+            ratio = q / p
+            entering = p < 0
+            leaving = p > 0
+            np.maximum(t0, ratio, out=t0, where=entering)
+            np.minimum(t1, ratio, out=t1, where=leaving)
+            t1[(p == 0) & (q < 0)] = -np.inf
+    return t0, t1
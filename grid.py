@@ -0,0 +1,35 @@
+import math
+import numpy as np
+
+
+class BucketGrid:
+    # A uniform grid over the bounding box of a site set, sized for about two sites per bucket. Buckets are
+    # numbered row by row; points outside the box fall into the nearest border bucket.
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.size = max(int(math.sqrt(len(x) / 2)), 1)
+        self.box = (x.min(), y.min(), x.max(), y.max()) if len(x) > 0 else (0.0, 0.0, 1.0, 1.0)
+        x0, y0, x1, y1 = self.box
+        self.bucket_width = ((x1 - x0) or 1.0) / self.size
+        self.bucket_height = ((y1 - y0) or 1.0) / self.size
+
+    def cells(self, x, y):
+        # The (row, column) of every point.
+        x0, y0, x1, y1 = self.box
+        size = self.size
+        column = np.clip((np.asarray(x) - x0) / self.bucket_width, 0, size - 1).astype(np.int64)
+        row = np.clip((np.asarray(y) - y0) / self.bucket_height, 0, size - 1).astype(np.int64)
+        return row, column
+
+    def buckets(self, x, y):
+        row, column = self.cells(x, y)
+        return row * self.size + column
+
+    def bucket(self, x, y):
+        # buckets() for a single point, without NumPy.
+        x0, y0, x1, y1 = self.box
+        size = self.size
+        column = int(min(max((x - x0) / self.bucket_width, 0), size - 1))
+        row = int(min(max((y - y0) / self.bucket_height, 0), size - 1))
+        return row * size + column
@@ -0,0 +1,341 @@
+import math
+import random
+from array import array
+import numpy as np
+from fortune import FortuneSweep, circumcircle, proper_edges, voronoi_result
+from grid import BucketGrid
+from predicates import incircle, orientation
+
+GHOST = -1
+
+
+def edge_key(a, b):
+    return (a + 1) << 32 | (b + 1)
+
+
+class DynamicVoronoi:
+    # Voronoi diagram kept as its dual Delaunay triangulation so that sites can be added and removed with local
+    # repairs. Triangles are site triples of positive orientation in one flat array, three entries per slot; every
+    # hull edge (u, v) also has a ghost triangle (u, v, GHOST) on its outer side, so that points outside the hull
+    # need no special case. edges maps each directed edge to the triangle holding it, and site_triangle keeps one
+    # triangle per site to start walks from.
+    #
+    # insert() is Bowyer-Watson: find the triangles whose circumcircle holds the new site (a ghost counts when
+    # the site is beyond its hull edge) and fan the hole they leave from the site. remove() takes out the
+    # triangles around a site and fills the hole by clipping ears of its link polygon whose circumcircle holds
+    # no other link site. Either costs time in proportion to the triangles touched, plus a short walk from a
+    # site in the same grid bucket to find the first one.
+    #
+    # With fewer than three sites, or all of them on a line, there is no triangle to repair; the diagram is then
+    # re-swept on every change and result() falls back to a plain sweep.
+    def __init__(self, points=(), seed=0):
+        points = np.array(list(points), dtype=np.float64).reshape(-1, 2)
+        self.site_x = array("d", points[:, 0].tolist())
+        self.site_y = array("d", points[:, 1].tolist())
+        self.alive = bytearray(b"\x01") * len(self.site_x)
+        self.live_count = len(self.site_x)
+        self.random = random.Random(seed)
+        self.build()
+
+    def build(self):
+        self.triangles = array("i")
+        self.free = []
+        self.edges = {}
+        self.site_triangle = array("i", [-1]) * len(self.site_x)
+        self.triangle_count = 0
+
+        sites = np.flatnonzero(np.frombuffer(bytes(self.alive), dtype=np.uint8))
+        sweep = FortuneSweep(chunks=(np.column_stack((np.array(self.site_x)[sites], np.array(self.site_y)[sites])),))
+        sweep.run_all()
+        for triple in sites[sweep.delaunay_triangles()].tolist():
+            self.add_triangle(*triple)
+        for key in list(self.edges):
+            a = (key >> 32) - 1
+            b = (key & 0xFFFFFFFF) - 1
+            if edge_key(b, a) not in self.edges:
+                self.add_triangle(b, a, GHOST)
+
+        # A coarse grid over the current sites holding one site per bucket, as a start for walks.
+        x = np.array(self.site_x)[sites]
+        y = np.array(self.site_y)[sites]
+        self.bucket_grid = BucketGrid(x, y)
+        self.grid = array("i", [-1]) * (self.bucket_grid.size * self.bucket_grid.size)
+        for site, bucket in zip(sites.tolist(), self.bucket_grid.buckets(x, y).tolist()):
+            self.grid[bucket] = site
+
+    def __len__(self):
+        return self.live_count
+
+    def triangulated(self):
+        return self.triangle_count > 0
+
+    def add_triangle(self, a, b, c):
+        # Ghost triangles are rotated so that GHOST comes last.
+        if a == GHOST:
+            a, b, c = b, c, a
+        elif b == GHOST:
+            a, b, c = c, a, b
+        if self.free:
+            triangle = self.free.pop()
+            self.triangles[3 * triangle:3 * triangle + 3] = array("i", (a, b, c))
+        else:
+            triangle = len(self.triangles) // 3
+            self.triangles.extend((a, b, c))
+        for u, v in ((a, b), (b, c), (c, a)):
+            self.edges[edge_key(u, v)] = triangle
+        for site in (a, b, c):
+            if site != GHOST:
+                self.site_triangle[site] = triangle
+        if c != GHOST:
+            self.triangle_count += 1
+        return triangle
+
+    def remove_triangle(self, triangle):
+        a, b, c = self.triangles[3 * triangle:3 * triangle + 3]
+        for u, v in ((a, b), (b, c), (c, a)):
+            del self.edges[edge_key(u, v)]
+        self.triangles[3 * triangle] = -2
+        self.free.append(triangle)
+        if c != GHOST:
+            self.triangle_count -= 1
+
+    def conflicts(self, triangle, x, y):
+        a, b, c = self.triangles[3 * triangle:3 * triangle + 3]
+        site_x = self.site_x
+        site_y = self.site_y
+        if c == GHOST:
+            side = orientation(site_x[a], site_y[a], site_x[b], site_y[b], x, y)
+            if side == 0:
+                return self.conflicts(self.edges[edge_key(b, a)], x, y)
+            return side > 0
+        return incircle(site_x[a], site_y[a], site_x[b], site_y[b], site_x[c], site_y[c], x, y) > 0
+
+    def start_triangle(self, x, y):
+        site = self.grid[self.bucket_grid.bucket(x, y)]
+        if site >= 0 and self.alive[site] and self.site_triangle[site] >= 0:
+            return self.site_triangle[site]
+
+        # Jump and walk: the nearest of a small sample of live sites is usually a few triangles away.
+        best = None
+        best_distance = math.inf
+        for _ in range(int(round(self.live_count ** (1 / 3))) + 1):
+            site = self.random.randrange(len(self.site_x))
+            if self.alive[site] and self.site_triangle[site] >= 0:
+                distance = (self.site_x[site] - x) ** 2 + (self.site_y[site] - y) ** 2
+                if distance < best_distance:
+                    best = site
+                    best_distance = distance
+        if best is None:
+            return self.edges[next(iter(self.edges))]
+        return self.site_triangle[best]
+
+    def locate(self, x, y):
+        # Visibility walk towards (x, y); it ends in the triangle holding the point, or in the ghost beyond the
+        # hull edge it leaves through.
+        triangle = self.start_triangle(x, y)
+        site_x = self.site_x
+        site_y = self.site_y
+        while True:
+            a, b, c = self.triangles[3 * triangle:3 * triangle + 3]
+            if c == GHOST:
+                if orientation(site_x[a], site_y[a], site_x[b], site_y[b], x, y) > 0:
+                    return triangle
+                triangle = self.edges[edge_key(b, a)]
+                continue
+            for u, v in ((a, b), (b, c), (c, a)):
+                if orientation(site_x[u], site_y[u], site_x[v], site_y[v], x, y) < 0:
+                    triangle = self.edges[edge_key(v, u)]
+                    break
+            else:
+                return triangle
+
+    def insert(self, x, y):
+        if not self.triangulated():
+            for site in range(len(self.site_x)):
+                if self.alive[site] and self.site_x[site] == x and self.site_y[site] == y:
+                    raise ValueError("site (%r, %r) is already in the diagram" % (x, y))
+        site = len(self.site_x)
+        self.site_x.append(x)
+        self.site_y.append(y)
+        self.alive.append(1)
+        self.site_triangle.append(-1)
+        self.live_count += 1
+        if not self.triangulated():
+            self.build()
+            return site
+
+        first = self.locate(x, y)
+        if not self.conflicts(first, x, y):
+            self.site_x.pop()
+            self.site_y.pop()
+            self.alive.pop()
+            self.site_triangle.pop()
+            self.live_count -= 1
+            raise ValueError("site (%r, %r) is already in the diagram" % (x, y))
+
+        cavity = {first}
+        pending = [first]
+        boundary = []
+        while pending:
+            triangle = pending.pop()
+            a, b, c = self.triangles[3 * triangle:3 * triangle + 3]
+            for u, v in ((a, b), (b, c), (c, a)):
+                neighbour = self.edges[edge_key(v, u)]
+                if neighbour in cavity:
+                    continue
+                if self.conflicts(neighbour, x, y):
+                    cavity.add(neighbour)
+                    pending.append(neighbour)
+                else:
+                    boundary.append((u, v))
+
+        for triangle in cavity:
+            self.remove_triangle(triangle)
+        for u, v in boundary:
+            self.add_triangle(u, v, site)
+        self.grid[self.bucket_grid.bucket(x, y)] = site
+        return site
+
+    def star(self, site):
+        # The link of a site in counter-clockwise order, with the triangles around it.
+        first = self.site_triangle[site]
+        link = []
+        triangles = []
+        triangle = first
+        while True:
+            a, b, c = self.triangles[3 * triangle:3 * triangle + 3]
+            if a == site:
+                u, v = b, c
+            elif b == site:
+                u, v = c, a
+            else:
+                u, v = a, b
+            link.append(u)
+            triangles.append(triangle)
+            triangle = self.edges[edge_key(site, v)]
+            if triangle == first:
+                return link, triangles
+
+    def is_ear(self, link, i, delaunay=True):
+        site_x = self.site_x
+        site_y = self.site_y
+        a = link[i - 1]
+        b = link[i]
+        c = link[(i + 1) % len(link)]
+        if GHOST in (a, b, c):
+            return False
+        if orientation(site_x[a], site_y[a], site_x[b], site_y[b], site_x[c], site_y[c]) <= 0:
+            return False
+        if not delaunay:
+            return True
+        for other in link:
+            if other not in (a, b, c, GHOST) and incircle(site_x[a], site_y[a], site_x[b], site_y[b],
+                                                          site_x[c], site_y[c], site_x[other], site_y[other]) > 0:
+                return False
+        return True
+
+    def remove(self, site):
+        if not self.alive[site]:
+            raise ValueError("site %d is not in the diagram" % site)
+        self.alive[site] = 0
+        self.live_count -= 1
+        if not self.triangulated() or self.live_count < 3:
+            self.build()
+            return
+        if self.site_triangle[site] < 0:
+            # A duplicate of another site, with no triangle of its own.
+            return
+
+        link, triangles = self.star(site)
+        for triangle in triangles:
+            self.remove_triangle(triangle)
+        self.site_triangle[site] = -1
+        bucket = self.bucket_grid.bucket(self.site_x[site], self.site_y[site])
+        if self.grid[bucket] == site:
+            self.grid[bucket] = max(link)
+
+        # Clip Delaunay ears until a triangle is left, or, for a hull site, until the chain between the two
+        # ghosts is convex; that chain is the new stretch of hull and gets ghost triangles. Co-circular links
+        # can run out of strictly Delaunay ears, and then any convex ear will do.
+        hull = GHOST in link
+        while len(link) > 3:
+            ears = [i for i in range(len(link)) if self.is_ear(link, i)]
+            if not ears:
+                ears = [i for i in range(len(link)) if self.is_ear(link, i, delaunay=False)]
+            if not ears:
+                break
+            i = ears[0]
+            self.add_triangle(link[i - 1], link[i], link[(i + 1) % len(link)])
+            del link[i]
+        if hull:
+            i = link.index(GHOST)
+            chain = link[i + 1:] + link[:i]
+            for u, v in zip(chain, chain[1:]):
+                self.add_triangle(u, v, GHOST)
+        else:
+            self.add_triangle(*link)
+
+        if not self.triangulated():
+            self.build()
+
+    def neighbors(self, site):
+        if not self.triangulated():
+            return self.result().neighbors[site]
+        return sorted(u for u in self.star(site)[0] if u != GHOST)
+
+    def delaunay_triangles(self):
+        triangles = np.frombuffer(self.triangles.tobytes(), dtype=np.int32).reshape(-1, 3)
+        return triangles[(triangles[:, 0] >= 0) & (triangles[:, 2] != GHOST)]
+
+    def result(self):
+        site_count = len(self.site_x)
+        if not self.triangulated():
+            sites = np.flatnonzero(np.frombuffer(bytes(self.alive), dtype=np.uint8))
+            sweep = FortuneSweep(chunks=(np.column_stack((np.array(self.site_x)[sites],
+                                                          np.array(self.site_y)[sites])),))
+            sweep.run_all()
+            local = sweep.result()
+            edges = local.edges.copy()
+            edges[:, :2] = sites[edges[:, :2]]
+            return voronoi_result(local.vertices, edges, sites[local.triangles].astype(np.int32), site_count)
+
+        # One Voronoi vertex per real triangle, except that triangles whose circles coincide, across an edge whose
+        # far site lies on the circle, share one vertex as the sweep gives them, and the edge between them goes.
+        # Each Delaunay edge (a, b) with a < b becomes a Voronoi edge whose end 0, in the direction
+        # (ay - by, bx - ax), is the centre of the triangle holding the directed edge (a, b).
+        slots = np.frombuffer(self.triangles.tobytes(), dtype=np.int32).reshape(-1, 3)
+        real = (slots[:, 0] >= 0) & (slots[:, 2] != GHOST)
+        site_x = self.site_x
+        site_y = self.site_y
+        parent = list(range(len(slots)))
+
+        def find(triangle):
+            while parent[triangle] != triangle:
+                parent[triangle] = parent[parent[triangle]]
+                triangle = parent[triangle]
+            return triangle
+
+        pairs = []
+        for key, triangle in self.edges.items():
+            a = (key >> 32) - 1
+            b = (key & 0xFFFFFFFF) - 1
+            if GHOST < a < b:
+                twin = self.edges[edge_key(b, a)]
+                pairs.append((a, b, triangle, twin))
+                if real[triangle] and real[twin]:
+                    u, v, w = self.triangles[3 * triangle:3 * triangle + 3]
+                    c = sum(self.triangles[3 * twin:3 * twin + 3]) - a - b
+                    if incircle(site_x[u], site_y[u], site_x[v], site_y[v], site_x[w], site_y[w],
+                                site_x[c], site_y[c]) == 0:
+                        parent[find(twin)] = find(triangle)
+
+        node = np.full(len(slots), -1, dtype=np.int32)
+        first = {}
+        for triangle in np.flatnonzero(real).tolist():
+            node[triangle] = first.setdefault(find(triangle), len(first))
+        vertices = np.array([circumcircle(site_x[a], site_y[a], site_x[b], site_y[b], site_x[c], site_y[c])[:2]
+                             for a, b, c in slots[list(first)].tolist()])
+
+        edges = np.array([(a, b, node[triangle], node[twin]) for a, b, triangle, twin in pairs],
+                         dtype=np.int32).reshape(-1, 4)
+        return voronoi_result(vertices.reshape(-1, 2), edges[proper_edges(edges)], slots[real].copy(), site_count)
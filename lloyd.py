@@ -0,0 +1,266 @@
+import numpy as np
+from fortune import FortuneSweep, proper_edges
+from geometry import box_position, clip_lines
+from predicates import ORIENTATION_BOUND, incircle
+from vectorized import circumcircles
+
+
+def cycle(triangle, i):
+    # The vertices of a triangle starting at its i-th, so that the edge opposite it comes second and third.
+    return triangle[i], triangle[(i + 1) % 3], triangle[(i + 2) % 3]
+
+
+class Triangulation:
+    # The Delaunay triangulation behind the previous iteration's diagram, kept so the next one can be repaired
+    # instead of swept again. triangles holds site triples of positive orientation; neighbours[t, i] is the
+    # triangle across the edge opposite triangles[t, i], or -1 on the hull.
+    def __init__(self, triangles):
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        # Every edge turns up once in each direction, so sorting both keys pairs it with its twin.
+        t = self.triangles
+        a = t[:, [1, 2, 0]].reshape(-1)
+        b = t[:, [2, 0, 1]].reshape(-1)
+        scale = int(t.max()) + 1 if len(t) > 0 else 1
+        keys = a * scale + b
+        twins = b * scale + a
+        order = np.argsort(keys)
+        found = np.minimum(np.searchsorted(keys[order], twins), len(keys) - 1)
+        matched = keys[order[found]] == twins
+        self.neighbours = np.where(matched, order[found] // 3, -1).reshape(-1, 3)
+
+    def valid(self, points):
+        # Whether the triangulation is still one for the moved sites: every triangle keeps its orientation and
+        # the hull stays convex, so that edge flips alone can make it Delaunay again.
+        x = points[:, 0]
+        y = points[:, 1]
+        a, b, c = self.triangles.T
+        left = (x[b] - x[a]) * (y[c] - y[a])
+        right = (y[b] - y[a]) * (x[c] - x[a])
+        if not np.all(left - right > ORIENTATION_BOUND * (abs(left) + abs(right))):
+            return False
+        # The hull edges p -> q run clockwise, with the outside on their left.
+        t, i = np.nonzero(self.neighbours < 0)
+        p = self.triangles[t, (i + 2) % 3]
+        q = self.triangles[t, (i + 1) % 3]
+        following = np.zeros(len(points), dtype=np.int64)
+        following[p] = q
+        r = following[q]
+        return not np.any((x[q] - x[p]) * (y[r] - y[p]) - (y[q] - y[p]) * (x[r] - x[p]) > 0)
+
+    def violations(self, points):
+        # (triangle, i) for every interior edge whose far site lies inside the triangle's circumcircle.
+        x = points[:, 0]
+        y = points[:, 1]
+        t, i = np.nonzero(self.neighbours >= 0)
+        u = self.neighbours[t, i]
+        keep = t < u
+        t, i, u = t[keep], i[keep], u[keep]
+        far = self.triangles[u, np.argmax(self.neighbours[u] == t[:, None], axis=1)]
+        a, b, c = self.triangles[t].T
+        ax, ay = x[a] - x[far], y[a] - y[far]
+        bx, by = x[b] - x[far], y[b] - y[far]
+        cx, cy = x[c] - x[far], y[c] - y[far]
+        det = ((ax * ax + ay * ay) * (bx * cy - by * cx) + (bx * bx + by * by) * (cx * ay - cy * ax)
+               + (cx * cx + cy * cy) * (ax * by - ay * bx))
+        bad = det > 0
+        return t[bad], i[bad]
+
+    def repair(self, points):
+        # Lawson flips from the violated edges outwards until every edge is locally Delaunay; returns the count.
+        triangles = self.triangles
+        neighbours = self.neighbours
+        site_x = points[:, 0].tolist()
+        site_y = points[:, 1].tolist()
+        stack = list(zip(*(side.tolist() for side in self.violations(points))))
+        flips = 0
+        while stack:
+            t, i = stack.pop()
+            u = int(neighbours[t, i])
+            if u < 0:
+                continue
+            p, a, b = cycle(triangles[t].tolist(), i)
+            j = neighbours[u].tolist().index(t)
+            q = int(triangles[u, j])
+            if incircle(site_x[p], site_y[p], site_x[a], site_y[a], site_x[b], site_y[b], site_x[q], site_y[q]) <= 0:
+                continue
+            # t = (p, a, b) and u = (q, b, a) become t = (p, a, q) and u = (q, b, p).
+            across_bp = int(neighbours[t, (i + 1) % 3])
+            across_pa = int(neighbours[t, (i + 2) % 3])
+            across_aq = int(neighbours[u, (j + 1) % 3])
+            across_qb = int(neighbours[u, (j + 2) % 3])
+            triangles[t] = (p, a, q)
+            triangles[u] = (q, b, p)
+            neighbours[t] = (across_aq, u, across_pa)
+            neighbours[u] = (across_bp, t, across_qb)
+            if across_aq >= 0:
+                neighbours[across_aq, neighbours[across_aq].tolist().index(u)] = t
+            if across_bp >= 0:
+                neighbours[across_bp, neighbours[across_bp].tolist().index(t)] = u
+            stack.extend(((t, 0), (t, 2), (u, 0), (u, 2)))
+            flips += 1
+        return flips
+
+    def edges(self):
+        # (left, right, node0, node1) for every edge as FortuneSweep numbers them, with node t the circumcentre of
+        # triangle t: an interior edge a -> b of t has t at end 0, and a hull edge is open on its outer side.
+        t, i = np.nonzero(np.ones_like(self.neighbours, dtype=bool))
+        u = self.neighbours[t, i]
+        a = self.triangles[t, (i + 1) % 3]
+        b = self.triangles[t, (i + 2) % 3]
+        interior = t < u
+        hull = u < 0
+        return np.concatenate((np.column_stack((a[interior], b[interior], t[interior], u[interior])),
+                               np.column_stack((b[hull], a[hull], np.full(hull.sum(), -1), t[hull]))))
+
+    def vertices(self, points):
+        a, b, c = self.triangles.T
+        return circumcircles(points[a, 0], points[a, 1], points[b, 0], points[b, 1], points[c, 0], points[c, 1])[0]
+
+
+class LloydRelaxation:
+    # Lloyd's algorithm: every iteration moves each site to the centroid of its cell clipped to `bbox`. Cell
+    # moments are summed over triangles fanned from the site, one per clipped edge and one per stretch of the box
+    # boundary inside the cell, in a few NumPy passes over all edges at once; the site arrays are double-buffered.
+    # With `warm_start`, the Delaunay triangulation of one iteration is carried to the next, and as long as the
+    # moved sites leave it a triangulation, the few edges they made non-Delaunay are flipped instead of sweeping
+    # all the sites again.
+    def __init__(self, points, bbox, warm_start=True):
+        self.points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        self.next_points = np.empty_like(self.points)
+        self.bbox = tuple(float(value) for value in bbox)
+        self.warm_start = warm_start
+        self.triangulation = None
+        self.iterations = 0
+        self.sweeps = 0
+        self.flips = 0
+        self.displacement = np.inf
+
+    def diagram(self):
+        # Edges as (left, right, node0, node1), vertices and edge origins for the current sites.
+        triangulation = self.triangulation
+        if triangulation is not None and triangulation.valid(self.points):
+            self.flips += triangulation.repair(self.points)
+            return triangulation.edges(), triangulation.vertices(self.points), None
+
+        sweep = FortuneSweep(chunks=(self.points,))
+        sweep.run_all()
+        self.sweeps += 1
+        triangles = sweep.delaunay_triangles()
+        self.triangulation = Triangulation(triangles) if self.warm_start and len(triangles) > 0 else None
+        nodes = np.array(sweep.edge_nodes, dtype=np.int64).reshape(-1, 2)
+        edges = np.column_stack((np.array(sweep.edge_left), np.array(sweep.edge_right), nodes)).reshape(-1, 4)
+        origins = np.column_stack((np.array(sweep.edge_origin_x), np.array(sweep.edge_origin_y))).reshape(-1, 2)
+        vertices = np.column_stack((np.array(sweep.vertex_x), np.array(sweep.vertex_y))).reshape(-1, 2)
+        kept = proper_edges(edges)
+        return edges[kept], vertices, origins[kept]
+
+    def centroids(self, edges, vertices, origins=None):
+        # Moments of each site's cell within the box, taken about the site: the cell's centroid is the site plus
+        # (moment_x, moment_y) / (3 * area), with area twice the cell's. Sites whose cell misses the box (and
+        # duplicates, which have none) get area 0.
+        points = self.points
+        box = self.bbox
+        site_count = len(points)
+        left, right, node0, node1 = edges.T
+        dx = points[left, 1] - points[right, 1]
+        dy = points[right, 0] - points[left, 0]
+
+        # Every edge as a line p + t d running from end 1 to end 0, with t limited to [0, 1] between two vertices.
+        bounded0 = node0 >= 0
+        bounded1 = node1 >= 0
+        anchor = np.where(bounded1, node1, node0)
+        px = np.zeros(len(edges)) if origins is None else origins[:, 0].copy()
+        py = np.zeros(len(edges)) if origins is None else origins[:, 1].copy()
+        px[anchor >= 0] = vertices[anchor[anchor >= 0], 0]
+        py[anchor >= 0] = vertices[anchor[anchor >= 0], 1]
+        both = bounded0 & bounded1
+        dx[both] = vertices[node0[both], 0] - px[both]
+        dy[both] = vertices[node0[both], 1] - py[both]
+        start = np.where(bounded1, 0.0, -np.inf)
+        stop = np.where(bounded0, np.where(bounded1, 1.0, 0.0), np.inf)
+        t0, t1 = clip_lines(px, py, dx, dy, start, stop, box)
+
+        inside = t0 < t1
+        ax = px[inside] + t0[inside] * dx[inside]
+        ay = py[inside] + t0[inside] * dy[inside]
+        bx = px[inside] + t1[inside] * dx[inside]
+        by = py[inside] + t1[inside] * dy[inside]
+        segment_left = left[inside]
+        segment_right = right[inside]
+
+        # Where edges cross the boundary, the boundary is cut into stretches; each lies in the cell of one of the
+        # two sites of the last edge crossed before it.
+        cut_start = t0[inside] > start[inside]
+        cut_stop = t1[inside] < stop[inside]
+        x0, y0, x1, y1 = box
+        cut_x = np.concatenate((ax[cut_start], bx[cut_stop], [x0, x1, x1, x0]))
+        cut_y = np.concatenate((ay[cut_start], by[cut_stop], [y0, y0, y1, y1]))
+        cut_edge = np.concatenate((np.flatnonzero(cut_start), np.flatnonzero(cut_stop), [-1, -1, -1, -1]))
+        order = np.argsort(box_position(cut_x, cut_y, box), kind="stable")
+        cut_x = cut_x[order]
+        cut_y = cut_y[order]
+        cut_edge = cut_edge[order]
+        crossed = np.flatnonzero(cut_edge >= 0)
+        if len(crossed) > 0:
+            last = np.maximum.accumulate(np.where(cut_edge >= 0, np.arange(len(cut_edge)), -1))
+            last[last < 0] = crossed[-1]
+            edge = cut_edge[last]
+            mid_x = (cut_x + np.roll(cut_x, -1)) / 2
+            mid_y = (cut_y + np.roll(cut_y, -1)) / 2
+            a = segment_left[edge]
+            b = segment_right[edge]
+            nearer_a = ((points[a, 0] - mid_x) ** 2 + (points[a, 1] - mid_y) ** 2
+                        <= (points[b, 0] - mid_x) ** 2 + (points[b, 1] - mid_y) ** 2)
+            owner = np.where(nearer_a, a, b)
+        else:
+            centre_x = (x0 + x1) / 2
+            centre_y = (y0 + y1) / 2
+            owner = np.full(len(cut_x), np.argmin((points[:, 0] - centre_x) ** 2 + (points[:, 1] - centre_y) ** 2))
+
+        # Fan triangles (site, a, b) for every boundary piece, walked with the cell on its left: clipped edges run
+        # end 1 -> end 0 around the left site and backwards around the right one, and the box runs the same way.
+        sites = np.concatenate((segment_left, segment_right, owner))
+        ax, bx = np.concatenate((ax, bx, cut_x)), np.concatenate((bx, ax, np.roll(cut_x, -1)))
+        ay, by = np.concatenate((ay, by, cut_y)), np.concatenate((by, ay, np.roll(cut_y, -1)))
+        sx = points[sites, 0]
+        sy = points[sites, 1]
+        ax -= sx
+        ay -= sy
+        bx -= sx
+        by -= sy
+        area = ax * by - ay * bx
+        cell_area = np.bincount(sites, area, site_count)
+        moment_x = np.bincount(sites, area * (ax + bx), site_count)
+        moment_y = np.bincount(sites, area * (ay + by), site_count)
+        return moment_x, moment_y, cell_area
+
+    def step(self):
+        if len(self.points) == 0:
+            # No sites, no cells to take centroids of.
+            self.displacement = 0.0
+            self.iterations += 1
+            return self.displacement
+        moment_x, moment_y, area = self.centroids(*self.diagram())
+        points = self.points
+        moved = self.next_points
+        has_area = area > 0
+        np.copyto(moved, points)
+        moved[has_area, 0] += moment_x[has_area] / (3 * area[has_area])
+        moved[has_area, 1] += moment_y[has_area] / (3 * area[has_area])
+        self.displacement = float(np.sqrt(((moved - points) ** 2).sum(axis=1).max()))
+        self.points, self.next_points = moved, points
+        self.iterations += 1
+        return self.displacement
+
+    def run(self, iterations, tolerance=0.0):
+        # Stops early once no site moves by more than `tolerance` in an iteration.
+        for _ in range(iterations):
+            if self.step() <= tolerance:
+                break
+        return self.points
+
+
+def relax(points, iterations, bbox, tolerance=0.0, warm_start=True):
+    # Runs up to `iterations` Lloyd iterations over the sites within bbox = (x0, y0, x1, y1) and returns the
+    # moved sites, in the input order.
+    return LloydRelaxation(points, bbox, warm_start).run(iterations, tolerance).copy()
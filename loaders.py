@@ -0,0 +1,47 @@
+import itertools
+import os
+import numpy as np
+
+# Every loader yields the sites of a file as (k, 2) float arrays of at most chunk_size rows, for
+# FortuneSweep(chunks=...). Only one chunk is materialised at a time.
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+
+def load_csv(path, chunk_size=DEFAULT_CHUNK_SIZE, delimiter=",", columns=(0, 1), skip_rows=0):
+    with open(path) as f:
+        lines = itertools.islice(f, skip_rows, None)
+        while True:
+            block = list(itertools.islice(lines, chunk_size))
+            if len(block) == 0:
+                return
+            yield np.loadtxt(block, delimiter=delimiter, usecols=columns, ndmin=2)
+
+
+def load_npy(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Memory-mapped, so a chunk is only read from disk when the sweep copies it into its site arrays.
+    points = np.load(path, mmap_mode="r")
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("expected an (n, 2) array of sites in %s, got shape %s" % (path, points.shape))
+    for start in range(0, len(points), chunk_size):
+        yield points[start:start + chunk_size]
+
+
+def load_binary(path, dtype="<f8", chunk_size=DEFAULT_CHUNK_SIZE):
+    # Headerless file of interleaved x, y values.
+    if os.path.getsize(path) == 0:
+        return
+    points = np.memmap(path, dtype=dtype, mode="r")
+    if len(points) % 2 != 0:
+        raise ValueError("%s holds an odd number of %s values" % (path, np.dtype(dtype)))
+    points = points.reshape(-1, 2)
+    for start in range(0, len(points), chunk_size):
+        yield points[start:start + chunk_size]
+
+
+def load_sites(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return load_npy(path, chunk_size)
+    if extension in (".csv", ".txt"):
+        return load_csv(path, chunk_size)
+    return load_binary(path, chunk_size=chunk_size)
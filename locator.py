@@ -0,0 +1,110 @@
+import numpy as np
+from grid import BucketGrid
+
+
+class SiteLocator:
+    # Nearest-site queries on a finished diagram. A grid of about two sites per bucket gives each query a start
+    # site close by, and a greedy walk over the site graph finishes the job: from any site that is not the
+    # nearest, one of its Voronoi neighbours is nearer, so a walk that keeps stepping to the nearest neighbour
+    # ends at the answer. Batches walk together, one vectorized step at a time.
+    def __init__(self, site_x, site_y, indptr, indices):
+        self.site_x = np.asarray(site_x, dtype=np.float64)
+        self.site_y = np.asarray(site_y, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+        site_count = len(self.site_x)
+        self.bucket_grid = BucketGrid(self.site_x, self.site_y)
+
+        # Every bucket gets a site inside it; an empty bucket borrows the nearest filled one along its row, or
+        # failing that, along its column. Walks only move along the site graph, so buckets are seeded with sites
+        # that have neighbours: a repeated site has none and would end every walk started from it.
+        size = self.bucket_grid.size
+        grid = np.full(size * size, -1, dtype=np.int64)
+        seeds = np.flatnonzero(self.indptr[1:site_count + 1] > self.indptr[:site_count])
+        if len(seeds) == 0:
+            seeds = np.arange(site_count)
+        grid[self.bucket_grid.buckets(self.site_x[seeds], self.site_y[seeds])] = seeds
+        grid = grid.reshape(size, size)
+        filled = self.fill_nearest(grid)
+        if np.any(filled < 0):
+            filled = self.fill_nearest(filled.T).T
+        self.grid = filled.reshape(-1)
+
+    @classmethod
+    def from_result(cls, site_x, site_y, result):
+        return cls(site_x, site_y, result.indptr, result.indices)
+
+    @classmethod
+    def from_sweep(cls, sweep):
+        return cls.from_result(np.array(sweep.site_x), np.array(sweep.site_y), sweep.result())
+
+    @staticmethod
+    def fill_nearest(grid):
+        # Copies each row's filled entries over its empty ones, taking whichever of the previous and next filled
+        # entry is nearer.
+        rows, columns = grid.shape
+        position = np.broadcast_to(np.arange(columns), grid.shape)
+        filled = grid >= 0
+        previous = np.maximum.accumulate(np.where(filled, position, -1), axis=1)
+        following = np.minimum.accumulate(np.where(filled, position, columns)[:, ::-1], axis=1)[:, ::-1]
+        use_following = (previous < 0) | ((following < columns) & (following - position < position - previous))
+        source = np.where(use_following, following, previous)
+        row = np.broadcast_to(np.arange(rows)[:, None], grid.shape)
+        valid = (source >= 0) & (source < columns)
+        result = np.full(grid.shape, -1, dtype=np.int64)
+        result[valid] = grid[row[valid], source[valid]]
+        return result
+
+    def locate(self, x, y):
+        if len(self.site_x) == 0:
+            return -1
+        site_x = self.site_x
+        site_y = self.site_y
+        site = int(self.grid[self.bucket_grid.bucket(x, y)])
+        distance = (site_x[site] - x) ** 2 + (site_y[site] - y) ** 2
+        while True:
+            neighbours = self.indices[self.indptr[site]:self.indptr[site + 1]]
+            if len(neighbours) == 0:
+                return site
+            distances = (site_x[neighbours] - x) ** 2 + (site_y[neighbours] - y) ** 2
+            best = int(np.argmin(distances))
+            if distances[best] >= distance:
+                return site
+            site = int(neighbours[best])
+            distance = distances[best]
+
+    def locate_many(self, xs, ys):
+        xs = np.asarray(xs, dtype=np.float64).reshape(-1)
+        ys = np.asarray(ys, dtype=np.float64).reshape(-1)
+        if len(self.site_x) == 0:
+            return np.full(len(xs), -1, dtype=np.int64)
+        sites = self.grid[self.bucket_grid.buckets(xs, ys)]
+        distances = (self.site_x[sites] - xs) ** 2 + (self.site_y[sites] - ys) ** 2
+        active = np.arange(len(xs))
+
+        while len(active) > 0:
+            current = sites[active]
+            starts = self.indptr[current]
+            degrees = self.indptr[current + 1] - starts
+            active = active[degrees > 0]
+            starts = starts[degrees > 0]
+            degrees = degrees[degrees > 0]
+            if len(active) == 0:
+                break
+
+            # All neighbours of all active queries in one flat run, one segment per query.
+            offsets = np.cumsum(degrees) - degrees
+            query = np.repeat(np.arange(len(active)), degrees)
+            neighbours = self.indices[starts[query] + np.arange(len(query)) - offsets[query]]
+            candidate = (self.site_x[neighbours] - xs[active[query]]) ** 2 + (self.site_y[neighbours] - ys[active[query]]) ** 2
+            best = np.minimum.reduceat(candidate, offsets)
+            closer = best < distances[active]
+            pick = np.flatnonzero(candidate == best[query])
+            first = pick[np.unique(query[pick], return_index=True)[1]]
+
+            moved = active[closer]
+            sites[moved] = neighbours[first[closer]]
+            distances[moved] = best[closer]
+            active = moved
+        return sites
@@ -1,4 +1,6 @@
+import sys
 import tkinter
+from loaders import load_sites
 from voronoi import VoronoiDiagram
 
 root = tkinter.Tk()
@@ -8,11 +10,11 @@ root.geometry("%dx%d+0+0" % (w, h))
 voronoi_diagram = VoronoiDiagram(root, width=w, height=h, borderwidth=0, highlightthickness=0, bg="black")
 voronoi_diagram.pack()
 root.update()
-voronoi_diagram.init_diagram()
+voronoi_diagram.init_diagram(load_sites(sys.argv[1]) if len(sys.argv) > 1 else None, threaded=True)
 
 def task():
-    voronoi_diagram.delete("all")
-    voronoi_diagram.render()
+    voronoi_diagram.update_frame()
+    voronoi_diagram.render_for(0.008)
     root.after(10, task)  # reschedule event in 2 seconds
 
 root.after(10, task)
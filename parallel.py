@@ -0,0 +1,308 @@
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from fortune import FortuneSweep, SiteEvent, circumcircle, compute_voronoi, proper_edges, voronoi_result
+from predicates import circumcircle_exact
+
+# What sweep_tile returns for a tile whose cells failed: the x range the tile's sweep has to take in for them.
+Reach = namedtuple("Reach", ["x0", "x1"])
+# What it returns for a tile whose cells pass. The tile's circle events, vertices first: their site triples, (y, x)
+# keys, roots and how many events after the root they were popped; the y of the vertices; the edges of the cells
+# whose left site the tile owns; and the site pair of every edge of an owned cell with the event that opened it.
+Tile = namedtuple("Tile", ["event_sites", "event_keys", "roots", "subs", "vertex_y", "edge_sites", "edge_nodes",
+                           "pairs", "openers"])
+
+# Set in each worker process by attach_sites: the sites sorted by x and the frame, as views into the parent's
+# shared block.
+shared_sites = None
+
+
+def attach_sites(name, site_count, frame_count):
+    global shared_sites
+    block = shared_memory.SharedMemory(name=name)
+    sites = np.ndarray((3, site_count), dtype=np.float64, buffer=block.buf)
+    frame = np.ndarray(frame_count, dtype=np.int64, buffer=block.buf, offset=sites.nbytes)
+    shared_sites = block, sites[0], sites[1], sites[2].view(np.int64), frame
+
+
+def frame_sites(x, y, buckets):
+    # The lowest and highest site of each of `buckets` equal-count runs of the x-sorted sites. Cells along the top
+    # and bottom of the set reach far sideways, so every tile sweeps this outline of the whole set along with its
+    # own strip.
+    bounds = np.linspace(0, len(x), buckets + 1).astype(np.int64)
+    bounds = np.unique(bounds)[:-1]
+    lowest = bounds + np.array([np.argmin(y[a:b]) for a, b in zip(bounds, np.append(bounds[1:], len(x)))])
+    highest = bounds + np.array([np.argmax(y[a:b]) for a, b in zip(bounds, np.append(bounds[1:], len(x)))])
+    return np.unique(np.concatenate((lowest, highest)))
+
+
+def sites_inside(x, y, ranges, frame, cx, cy, r):
+    # The x-sorted sites in `ranges` that lie in the circle, leaving out those swept with the tile.
+    inside = [lo + np.flatnonzero((x[lo:hi] - cx) ** 2 + (y[lo:hi] - cy) ** 2 <= r * r) for lo, hi in ranges if hi > lo]
+    return np.setdiff1d(np.concatenate(inside), frame) if inside else np.empty(0, dtype=np.int64)
+
+
+def sweep_tile(start, end, owned_start, owned_end):
+    # Sweeps the x-sorted sites [start, end) and checks that the cell of every site in [owned_start, owned_end) is
+    # the one the whole set would give it: each of its vertices has a circle free of the sites left out, and no
+    # site left out lies beyond an unbounded edge. If any cell fails, returns the Reach of the sites left out that
+    # broke it, found in a vertex circle or beyond an open edge, so the caller can widen the tile to take them in.
+    block, x, y, ids, frame = shared_sites
+    site_count = len(x)
+    frame = frame[(frame < start) | (frame >= end)]
+
+    # The key of every circle event as it is popped, and its root: the last event popped in (y, x) order up to
+    # it, with how many came after that one. Rounding can put a circle event above the event that queued it;
+    # the queue then pops it straight away, out of order.
+    vertex_events = []
+    extra_events = []
+    top = [(-math.inf, -math.inf), None, 0]
+
+    def follow(sweep, event):
+        extra = len(sweep.extra_nodes) > len(extra_events)
+        if isinstance(event, SiteEvent):
+            code = (event.site, -1, -1)
+        elif extra:
+            code = tuple(sweep.extra_triangles[-3:])
+        else:
+            code = tuple(sweep.vertex_sites[-3:])
+        if (event.y, event.x) >= top[0]:
+            top[:] = [(event.y, event.x), code, 0]
+        else:
+            top[2] += 1
+        if not isinstance(event, SiteEvent):
+            (extra_events if extra else vertex_events).append((event.y, event.x) + top[1] + (top[2],))
+
+    sweep = FortuneSweep(chunks=(np.column_stack((x[start:end], y[start:end])), np.column_stack((x[frame], y[frame]))),
+                         hook=follow)
+    sweep.run_all()
+
+    site_x = sweep.site_x
+    site_y = sweep.site_y
+    all_edges = np.column_stack((np.array(sweep.edge_left), np.array(sweep.edge_right),
+                                 np.array(sweep.edge_nodes, dtype=np.int32).reshape(-1, 2))).reshape(-1, 4)
+    edges = all_edges[proper_edges(all_edges)]
+    triples = np.array(sweep.vertex_sites, dtype=np.int64).reshape(-1, 3)
+    owned_left = (edges[:, 0] >= owned_start - start) & (edges[:, 0] < owned_end - start)
+    owned_right = (edges[:, 1] >= owned_start - start) & (edges[:, 1] < owned_end - start)
+    cell_edges = edges[owned_left | owned_right]
+    nodes = cell_edges[:, 2:].reshape(-1)
+    used = np.unique(nodes[nodes >= 0])
+
+    outside = ((0, start), (end, site_count))
+    left_limit = x[start - 1] if start > 0 else -math.inf
+    right_limit = x[end] if end < site_count else math.inf
+    reach_x0 = math.inf
+    reach_x1 = -math.inf
+    for node in used.tolist():
+        left, middle, right = triples[node].tolist()
+        corners = (site_x[left], site_y[left], site_x[middle], site_y[middle], site_x[right], site_y[right])
+        # The same circle the sweep put the vertex at, falling back to exact arithmetic where it did.
+        cx, cy, r = circumcircle(*corners) or circumcircle_exact(*corners)
+        if cx - r > left_limit and cx + r < right_limit:
+            continue
+        ranges = ((np.searchsorted(x, cx - r, "left"), start), (end, np.searchsorted(x, cx + r, "right")))
+        inside = sites_inside(x, y, ranges, frame, cx, cy, r)
+        if len(inside) > 0:
+            reach_x0 = min(reach_x0, x[inside].min())
+            reach_x1 = max(reach_x1, x[inside].max())
+
+    for left, right, node0, node1 in cell_edges[(cell_edges[:, 2] < 0) | (cell_edges[:, 3] < 0)].tolist():
+        dx = site_y[left] - site_y[right]
+        dy = site_x[right] - site_x[left]
+        for direction, node in ((1, node0), (-1, node1)):
+            if node >= 0:
+                continue
+            for lo, hi in outside:
+                beyond = ((x[lo:hi] - site_x[left]) * dx + (y[lo:hi] - site_y[left]) * dy) * direction > 0
+                beyond = np.setdiff1d(lo + np.flatnonzero(beyond), frame)
+                if len(beyond) > 0:
+                    reach_x0 = min(reach_x0, x[beyond].min())
+                    reach_x1 = max(reach_x1, x[beyond].max())
+    if reach_x0 <= reach_x1:
+        return Reach(reach_x0, reach_x1)
+
+    # Extra triangles of co-circular vertices go with every tile owning one of their sites, as the vertex does.
+    extras = np.array(sweep.extra_triangles, dtype=np.int64).reshape(-1, 3)
+    owned = np.any((extras >= owned_start - start) & (extras < owned_end - start), axis=1)
+
+    # Events are named by code: (site, -1, -1) for a site event, the site triple for a circle event. A circle
+    # event opens the edge between its outer sites and every other edge is opened by the site event of its right
+    # site. Two sites share one edge at most, so edges are named by their pair of sites, lowest first; the opener
+    # of each edge of an owned cell is reported, those of length zero between co-circular events included.
+    local_count = len(site_x)
+    pairs = np.sort(all_edges[:, :2], axis=1).astype(np.int64)
+    by_pair = np.argsort(pairs[:, 0] * local_count + pairs[:, 1])
+    sorted_keys = (pairs[:, 0] * local_count + pairs[:, 1])[by_pair]
+    openers = np.column_stack((all_edges[:, 1], np.full((len(all_edges), 2), -1))).astype(np.int64)
+    circles = np.concatenate((triples, extras))
+    openers[by_pair[np.searchsorted(sorted_keys, np.minimum(circles[:, 0], circles[:, 2]) * local_count
+                                    + np.maximum(circles[:, 0], circles[:, 2]))]] = circles
+    owned_pairs = np.any((pairs >= owned_start - start) & (pairs < owned_end - start), axis=1)
+
+    event_sites = np.concatenate((triples[used], extras[owned])).reshape(-1, 3)
+    events = np.array(vertex_events + extra_events, dtype=np.float64).reshape(-1, 6)
+    events = np.concatenate((events[used], events[len(triples):][owned]))
+    local = np.full(len(triples) + 1, -1, dtype=np.int64)
+    local[used] = np.arange(len(used))
+
+    site_ids = np.concatenate((ids[start:end], ids[frame]))
+
+    def global_codes(codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        return np.where(codes >= 0, site_ids[np.maximum(codes, 0)], -1)
+
+    edges = edges[owned_left]
+    # Open ends are clamped to 0 and masked out; `local` has a spare entry for a tile without vertices.
+    return Tile(site_ids[event_sites], events[:, :2], global_codes(events[:, 2:5]), events[:, 5].astype(np.int64),
+                np.array(sweep.vertex_y)[used], site_ids[edges[:, :2]],
+                np.where(edges[:, 2:] >= 0, local[np.maximum(edges[:, 2:], 0)], -1),
+                site_ids[pairs[owned_pairs]], global_codes(openers[owned_pairs]))
+
+
+def parallel_voronoi(points, tiles=None, guard=None, max_workers=None, max_guard=0.25):
+    # Splits the sites into vertical strips of equal count, sweeps each strip plus a guard band of neighbouring
+    # sites and the frame in a worker process and stitches the certified cells back together. Vertices and edges are
+    # numbered as the serial sweep numbers them, in the order it pops the events that create them, so the result
+    # matches compute_voronoi(points) exactly, co-circular and collinear sites included. A tile whose cells fail is
+    # swept again over the x range they reach; once a tile's guard band holds more than `max_guard` of all the
+    # sites, as on strongly clustered input, splitting no longer pays and the sites are swept serially instead.
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    site_count = len(points)
+    if tiles is None:
+        tiles = os.cpu_count() or 1
+    if guard is None:
+        guard = 4 * int(math.sqrt(site_count)) + 16
+    tiles = min(tiles, site_count // (4 * guard))
+    if tiles <= 1:
+        return compute_voronoi(points)
+
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    frame = frame_sites(points[order, 0], points[order, 1], int(math.sqrt(site_count)))
+    block = shared_memory.SharedMemory(create=True, size=8 * (3 * site_count + len(frame)))
+    try:
+        sites = np.ndarray((3, site_count), dtype=np.float64, buffer=block.buf)
+        sites[0] = points[order, 0]
+        sites[1] = points[order, 1]
+        sites[2].view(np.int64)[:] = order
+        np.ndarray(len(frame), dtype=np.int64, buffer=block.buf, offset=sites.nbytes)[:] = frame
+        del sites
+
+        bounds = np.linspace(0, site_count, tiles + 1).astype(np.int64).tolist()
+        starts = [max(bounds[tile] - guard, 0) for tile in range(tiles)]
+        ends = [min(bounds[tile + 1] + guard, site_count) for tile in range(tiles)]
+        sorted_x = points[order, 0]
+        results = [None] * tiles
+        with ProcessPoolExecutor(max_workers, initializer=attach_sites, initargs=(block.name, site_count, len(frame))) as pool:
+            pending = list(range(tiles))
+            while pending:
+                futures = {tile: pool.submit(sweep_tile, starts[tile], ends[tile], bounds[tile], bounds[tile + 1])
+                           for tile in pending}
+                pending = []
+                for tile, future in futures.items():
+                    results[tile] = future.result()
+                    if isinstance(results[tile], Reach):
+                        reach = results[tile]
+                        starts[tile] = min(starts[tile], int(np.searchsorted(sorted_x, reach.x0, "left")))
+                        ends[tile] = max(ends[tile], int(np.searchsorted(sorted_x, reach.x1, "right")))
+                        pending.append(tile)
+                if any(ends[tile] - starts[tile] - (bounds[tile + 1] - bounds[tile]) > max_guard * site_count
+                       for tile in pending):
+                    break
+    finally:
+        block.close()
+        block.unlink()
+
+    if pending:
+        return compute_voronoi(points)
+    return stitch_tiles(results, points)
+
+
+def find_rows(table, rows):
+    # The index of each of `rows` in `table`, unique and sorted as np.unique(axis=0) leaves it, which holds them all.
+    inverse = np.unique(np.concatenate((table, rows)), axis=0, return_inverse=True)[1]
+    return inverse.reshape(-1)[len(table):]
+
+
+def stitch_tiles(tiles, points):
+    # A circle event turns up in every tile that owns one of the cells at its vertex; copies are matched on their
+    # site triple. Events are ranked as the serial sweep pops them: by the (y, x) of their key, a site before a
+    # circle event, and circle events on one key in the order they were queued, that is by the rank of the event
+    # that queued them and then left arc first. That event opened the later of the two edges the circle event
+    # closes, so ranks are refined until they settle. An event popped out of order follows its root.
+    site_count = len(points)
+    sites = np.concatenate([tile.event_sites for tile in tiles]).reshape(-1, 3)
+    circles, first = np.unique(sites, axis=0, return_index=True)
+    copies = find_rows(circles, sites)
+
+    def event_index(codes):
+        codes = codes.reshape(-1, 3)
+        index = codes[:, 0].copy()
+        circle = codes[:, 1] >= 0
+        index[circle] = site_count + find_rows(circles, codes[circle])
+        return index
+
+    count = site_count + len(circles)
+    keys = np.concatenate([tile.event_keys for tile in tiles]).reshape(-1, 2)
+    event_y = np.concatenate((points[:, 1], keys[first, 0]))
+    event_x = np.concatenate((points[:, 0], keys[first, 1]))
+    kind = np.concatenate((np.zeros(site_count, dtype=np.int64), np.ones(len(circles), dtype=np.int64)))
+    root = np.arange(count)
+    root[site_count:] = event_index(np.concatenate([tile.roots for tile in tiles]))[first]
+    sub = np.zeros(count, dtype=np.int64)
+    sub[site_count:] = np.concatenate([tile.subs for tile in tiles])[first]
+    pairs = np.concatenate([tile.pairs for tile in tiles]).reshape(-1, 2)
+    pair_keys, pair_first = np.unique(np.sort(pairs, axis=1) @ [site_count, 1], return_index=True)
+    pair_openers = event_index(np.concatenate([tile.openers for tile in tiles]))[pair_first]
+
+    def opener(a, b):
+        return pair_openers[np.searchsorted(pair_keys, np.minimum(a, b) * site_count + np.maximum(a, b))]
+
+    # The two edges a circle event closes are the ones either side of its middle arc.
+    opened = np.column_stack((opener(circles[:, 0], circles[:, 1]), opener(circles[:, 1], circles[:, 2])))
+
+    rank = np.zeros(count, dtype=np.int64)
+    while True:
+        queued = np.zeros(count, dtype=np.int64)
+        second = np.zeros(count, dtype=np.int64)
+        queued[site_count:] = np.maximum(rank[opened[:, 0]], rank[opened[:, 1]])
+        second[site_count:] = rank[opened[:, 0]] > rank[opened[:, 1]]
+        order = np.lexsort((np.arange(count), sub, second[root], queued[root], kind[root], event_x[root],
+                            event_y[root]))
+        settled = np.empty(count, dtype=np.int64)
+        settled[order] = np.arange(count)
+        if np.array_equal(settled, rank):
+            break
+        rank = settled
+
+    # Vertices are numbered, and extra triangles follow the vertex triangles, in the order of their events.
+    is_vertex = np.concatenate([np.arange(len(tile.event_sites)) < len(tile.vertex_y) for tile in tiles])[first]
+    circle_rank = rank[site_count:]
+    vertex_circles = np.flatnonzero(is_vertex)
+    vertex_circles = vertex_circles[np.argsort(circle_rank[vertex_circles])]
+    extra_circles = np.flatnonzero(~is_vertex)
+    extra_circles = extra_circles[np.argsort(circle_rank[extra_circles])]
+    number = np.full(len(circles), -1, dtype=np.int64)
+    number[vertex_circles] = np.arange(len(vertex_circles))
+    triangles = np.concatenate((circles[vertex_circles], circles[extra_circles])).astype(np.int32)
+
+    vertex_x = np.empty(len(vertex_circles))
+    vertex_y = np.empty(len(vertex_circles))
+    edges = []
+    edge_ranks = []
+    offset = 0
+    for tile in tiles:
+        # The vertex number of each of the tile's vertices, with -1 for open ends at the spare last entry.
+        numbers = np.append(number[copies[offset:offset + len(tile.vertex_y)]], -1)
+        vertex_x[numbers[:-1]] = tile.event_keys[:len(tile.vertex_y), 1]
+        vertex_y[numbers[:-1]] = tile.vertex_y
+        edges.append(np.column_stack((tile.edge_sites, numbers[tile.edge_nodes])))
+        edge_ranks.append(rank[opener(tile.edge_sites[:, 0], tile.edge_sites[:, 1])])
+        offset += len(tile.event_sites)
+    vertices = np.column_stack((vertex_x, vertex_y)).reshape(-1, 2)
+    edges = np.concatenate(edges).reshape(-1, 4)
+    edges = edges[np.argsort(np.concatenate(edge_ranks), kind="stable")].astype(np.int32)
+    return voronoi_result(vertices, edges, triangles, site_count)
@@ -0,0 +1,87 @@
+import math
+from fractions import Fraction
+
+# Orientation and in-circle tests with a floating-point filter: the plain determinant is trusted whenever it is
+# larger than a bound on its rounding error (Shewchuk's first-stage bounds), and only the rare inputs that fall
+# inside the bound, such as collinear or co-circular sites on a grid, are recomputed exactly in integers.
+EPSILON = 2.0 ** -53
+ORIENTATION_BOUND = (3 + 16 * EPSILON) * EPSILON
+INCIRCLE_BOUND = (10 + 96 * EPSILON) * EPSILON
+
+
+def sign(value):
+    return float((value > 0) - (value < 0))
+
+
+def orientation(x1, y1, x2, y2, x3, y3):
+    # Positive when the three sites turn counter-clockwise (in y-up terms), negative clockwise, zero on a line.
+    left = (x2 - x1) * (y3 - y1)
+    right = (y2 - y1) * (x3 - x1)
+    det = left - right
+    if abs(det) > ORIENTATION_BOUND * (abs(left) + abs(right)):
+        return det
+    return sign(orientation_exact(x1, y1, x2, y2, x3, y3))
+
+
+def integers(*values):
+    # Every float is a 53-bit integer times a power of two, so shifting all of them to the smallest exponent among
+    # them turns them into Python ints at one common scale; signs and zeros of polynomials in those are exact.
+    parts = [(int(mantissa * 2.0 ** 53), exponent) for mantissa, exponent in map(math.frexp, values)]
+    low = min([exponent for mantissa, exponent in parts if mantissa] or [0])
+    return [mantissa << (exponent - low) if mantissa else 0 for mantissa, exponent in parts]
+
+
+def orientation_exact(x1, y1, x2, y2, x3, y3):
+    x1, y1, x2, y2, x3, y3 = integers(x1, y1, x2, y2, x3, y3)
+    return (x2 - x1) * (y3 - y1) - (y2 - y1) * (x3 - x1)
+
+
+def incircle(x1, y1, x2, y2, x3, y3, x, y):
+    # Positive when (x, y) lies inside the circle through three sites of positive orientation, zero on it.
+    ax = x1 - x
+    ay = y1 - y
+    bx = x2 - x
+    by = y2 - y
+    cx = x3 - x
+    cy = y3 - y
+    a_lift = ax * ax + ay * ay
+    b_lift = bx * bx + by * by
+    c_lift = cx * cx + cy * cy
+    bc = bx * cy - by * cx
+    ca = cx * ay - cy * ax
+    ab = ax * by - ay * bx
+    det = a_lift * bc + b_lift * ca + c_lift * ab
+    permanent = (a_lift * (abs(bx * cy) + abs(by * cx)) + b_lift * (abs(cx * ay) + abs(cy * ax))
+                 + c_lift * (abs(ax * by) + abs(ay * bx)))
+    if abs(det) > INCIRCLE_BOUND * permanent:
+        return det
+    return sign(incircle_exact(x1, y1, x2, y2, x3, y3, x, y))
+
+
+def incircle_exact(x1, y1, x2, y2, x3, y3, x, y):
+    x1, y1, x2, y2, x3, y3, x, y = integers(x1, y1, x2, y2, x3, y3, x, y)
+    ax = x1 - x
+    ay = y1 - y
+    bx = x2 - x
+    by = y2 - y
+    cx = x3 - x
+    cy = y3 - y
+    return ((ax * ax + ay * ay) * (bx * cy - by * cx) + (bx * bx + by * by) * (cx * ay - cy * ax)
+            + (cx * cx + cy * cy) * (ax * by - ay * bx))
+
+
+def circumcircle_exact(x1, y1, x2, y2, x3, y3):
+    # For nearly collinear sites whose float determinant rounds to zero; returns None only for collinear ones.
+    x1, y1, x2, y2, x3, y3 = map(Fraction, (x1, y1, x2, y2, x3, y3))
+    bx = x2 - x1
+    by = y2 - y1
+    cx = x3 - x1
+    cy = y3 - y1
+    d = 2 * (bx * cy - by * cx)
+    if d == 0:
+        return None
+    b2 = bx * bx + by * by
+    c2 = cx * cx + cy * cy
+    ux = (cy * b2 - by * c2) / d
+    uy = (bx * c2 - cx * b2) / d
+    return float(x1 + ux), float(y1 + uy), math.hypot(float(ux), float(uy))
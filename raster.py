@@ -0,0 +1,275 @@
+import argparse
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from fortune import FortuneSweep
+from geometry import clip_lines
+from loaders import load_sites
+from vectorized import parabola_coefficients, parabola_polyline
+from worker import Frame
+
+# The Tk colour names VoronoiDiagram draws with, as RGBA.
+COLORS = {
+    "black": (0, 0, 0, 255),
+    "white": (255, 255, 255, 255),
+    "red": (255, 0, 0, 255),
+    "blue": (0, 0, 255, 255),
+    "green": (0, 255, 0, 255),
+    "lightgreen": (144, 238, 144, 255),
+    "grey": (190, 190, 190, 255),
+    "orange": (255, 165, 0, 255),
+    "yellow": (255, 255, 0, 255),
+    "cyan": (0, 255, 255, 255),
+}
+SITE_COLORS = ["red", "blue", "white", "lightgreen"]
+# Points stamped per batch, to bound the (points x brush) index arrays.
+STAMP_BATCH = 1 << 16
+
+
+def brush(width):
+    # Pixel offsets covered by a round brush `width` pixels across.
+    radius = width / 2
+    reach = int(math.ceil(radius))
+    dy, dx = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+    inside = dx * dx + dy * dy <= max(radius * radius, 0.25)
+    return dx[inside], dy[inside]
+
+
+def png_bytes(pixels, level=6):
+    # Rows use the Sub filter, the difference to the pixel on the left, which turns the flat areas of a diagram
+    # into runs of zeros.
+    height, width = pixels.shape[:2]
+    rows = np.empty((height, 1 + 4 * width), dtype=np.uint8)
+    rows[:, 0] = 1
+    flat = pixels.reshape(height, 4 * width)
+    rows[:, 1:5] = flat[:, :4]
+    np.subtract(flat[:, 4:], flat[:, :-4], out=rows[:, 5:])
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows.tobytes(), level))
+            + chunk(b"IEND", b""))
+
+
+class Raster:
+    # An RGBA image as a (height, width, 4) uint8 array, drawn on with the canvas primitives VoronoiDiagram uses.
+    # Every call takes arrays and draws all of its lines, discs or circles at once.
+    def __init__(self, width, height, background="black"):
+        self.width = width
+        self.height = height
+        self.pixels = np.empty((height, width, 4), dtype=np.uint8)
+        self.pixels[:] = COLORS[background]
+
+    def stamp(self, x, y, color, width):
+        # The brush `width` pixels across at every point (x, y). Points whose brush lies inside the image are
+        # painted through flat pixel offsets, one 32-bit store per pixel; only those near the border are clipped.
+        x = np.rint(np.asarray(x, dtype=np.float64)).ravel()
+        y = np.rint(np.asarray(y, dtype=np.float64)).ravel()
+        dx, dy = brush(width)
+        reach = int(max(dx.max(), dy.max()))
+        near = (x > -reach - 1) & (x < self.width + reach) & (y > -reach - 1) & (y < self.height + reach)
+        x = x[near].astype(np.intp)
+        y = y[near].astype(np.intp)
+        inside = (x >= reach) & (x < self.width - reach) & (y >= reach) & (y < self.height - reach)
+        value = np.array(COLORS[color], dtype=np.uint8).view(np.uint32)[0]
+        flat = self.pixels.view(np.uint32).reshape(-1)
+        centres = y[inside] * self.width + x[inside]
+        offsets = dy * self.width + dx
+        for start in range(0, len(centres), STAMP_BATCH):
+            flat[(centres[start:start + STAMP_BATCH, None] + offsets).ravel()] = value
+        x = x[~inside]
+        y = y[~inside]
+        for start in range(0, len(x), STAMP_BATCH):
+            px = (x[start:start + STAMP_BATCH, None] + dx).ravel()
+            py = (y[start:start + STAMP_BATCH, None] + dy).ravel()
+            clipped = (px >= 0) & (px < self.width) & (py >= 0) & (py < self.height)
+            flat[py[clipped] * self.width + px[clipped]] = value
+
+    def lines(self, x0, y0, x1, y1, color, width=1):
+        # Segments from (x0, y0) to (x1, y1), cut to the image first so that far-off ends cost nothing, then
+        # sampled a pixel apart.
+        x0, y0, x1, y1 = (np.asarray(values, dtype=np.float64).ravel() for values in (x0, y0, x1, y1))
+        dx = x1 - x0
+        dy = y1 - y0
+        margin = width
+        t0, t1 = clip_lines(x0, y0, dx, dy, np.zeros(len(x0)), np.ones(len(x0)),
+                            (-margin, -margin, self.width + margin, self.height + margin))
+        keep = t0 <= t1
+        start_x = x0[keep] + t0[keep] * dx[keep]
+        start_y = y0[keep] + t0[keep] * dy[keep]
+        span_x = (t1[keep] - t0[keep]) * dx[keep]
+        span_y = (t1[keep] - t0[keep]) * dy[keep]
+        counts = np.ceil(np.hypot(span_x, span_y)).astype(np.int64) + 1
+        segment = np.repeat(np.arange(len(counts)), counts)
+        step = np.arange(len(segment)) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = step / np.maximum(counts - 1, 1)[segment]
+        self.stamp(start_x[segment] + t * span_x[segment], start_y[segment] + t * span_y[segment], color, width)
+
+    def polylines(self, polylines, color, width=1):
+        # Flat [x0, y0, x1, y1, ...] coordinate lists, as create_line takes them.
+        coords = [np.asarray(polyline, dtype=np.float64).reshape(-1, 2) for polyline in polylines if len(polyline) >= 4]
+        if not coords:
+            return
+        starts = np.concatenate([points[:-1] for points in coords])
+        ends = np.concatenate([points[1:] for points in coords])
+        self.lines(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1], color, width)
+
+    def discs(self, x, y, r, color):
+        self.stamp(x, y, color, 2 * r)
+
+    def circles(self, x, y, r, color, width=1):
+        # Outlines sampled a pixel apart; circles off the image, or around all of it, are left out.
+        x, y, r = (np.asarray(values, dtype=np.float64).ravel() for values in (x, y, r))
+        nearest = np.hypot(np.clip(x, 0, self.width) - x, np.clip(y, 0, self.height) - y)
+        farthest = np.hypot(np.maximum(x, self.width - x), np.maximum(y, self.height - y))
+        keep = np.isfinite(r) & (nearest <= r + width) & (farthest >= r - width)
+        x, y, r = x[keep], y[keep], r[keep]
+        counts = np.ceil(2 * math.pi * r).astype(np.int64) + 1
+        circle = np.repeat(np.arange(len(counts)), counts)
+        step = np.arange(len(circle)) - np.repeat(np.cumsum(counts) - counts, counts)
+        angle = 2 * math.pi * step / counts[circle]
+        self.stamp(x[circle] + r[circle] * np.cos(angle), y[circle] + r[circle] * np.sin(angle), color, width)
+
+    def png(self, level=6):
+        return png_bytes(self.pixels, level)
+
+    def save(self, path, level=6):
+        with open(path, "wb") as f:
+            f.write(self.png(level))
+
+
+def site_groups(sites):
+    # (colour, positions in `sites`) pairs, with the colours VoronoiDiagram.site_color gives and in the order Tk
+    # stacks them.
+    groups = [(color, np.flatnonzero(sites == site)) for site, color in enumerate(SITE_COLORS)]
+    groups.append(("red", np.flatnonzero(sites >= len(SITE_COLORS))))
+    return groups
+
+
+def draw_frame(raster, frame, site_x, site_y, show_circles=True, show_parabolas=True, show_beachline=False):
+    # What VoronoiDiagram.render draws for `frame`, with the same colours and widths, layer over layer in the
+    # order of VoronoiDiagram.layers.
+    viewport = (0, 0, raster.width, raster.height)
+    sweep_y = frame.sweep_y
+    raster.lines([0], [sweep_y], [raster.width], [sweep_y], "green", 5)
+
+    beach_line = frame.beach_line
+    if show_parabolas:
+        sites = np.flatnonzero(site_y < sweep_y)
+        coefficients = parabola_coefficients(site_x[sites], site_y[sites], sweep_y)
+        for color, chosen in site_groups(sites):
+            raster.polylines([parabola_polyline(a, b, c, -math.inf, math.inf, viewport)
+                              for a, b, c in coefficients[:, chosen].T.tolist()], color, 2)
+        finite = np.isfinite(beach_line.breakpoint_y)
+        raster.discs(beach_line.breakpoint_x[finite], beach_line.breakpoint_y[finite], 7, "orange")
+
+    if show_beachline:
+        lefts, rights = beach_line.arc_bounds()
+        visible = beach_line.focus_y < sweep_y
+        raster.polylines([parabola_polyline(a, b, c, left, right, viewport)
+                          for (a, b, c), left, right, shown in zip(beach_line.coefficients.T.tolist(), lefts.tolist(),
+                                                                   rights.tolist(), visible.tolist()) if shown],
+                         "yellow", 4)
+
+    circles = frame.circle_events
+    if show_circles and len(circles) > 0:
+        raster.discs(circles[:, 0], circles[:, 1], 9, "cyan")
+        raster.circles(circles[:, 2], circles[:, 3], circles[:, 4], "cyan", 2)
+
+    for color, chosen in site_groups(np.arange(len(site_x))):
+        raster.discs(site_x[chosen], site_y[chosen], 9, color)
+
+    nodes = frame.edge_nodes
+    fixed = np.flatnonzero(nodes >= 0)
+    edges = fixed // 2
+    start_x = [frame.edge_origin_x[edges]]
+    start_y = [frame.edge_origin_y[edges]]
+    end_x = [frame.vertex_x[nodes[fixed]]]
+    end_y = [frame.vertex_y[nodes[fixed]]]
+    traced = np.isfinite(beach_line.breakpoint_y)
+    if traced.any():
+        edges = np.array([breakpoint.edge for breakpoint in beach_line.breakpoints], dtype=np.int64)[traced]
+        start_x.append(frame.edge_origin_x[edges])
+        start_y.append(frame.edge_origin_y[edges])
+        end_x.append(beach_line.breakpoint_x[traced])
+        end_y.append(beach_line.breakpoint_y[traced])
+    raster.lines(np.concatenate(start_x), np.concatenate(start_y), np.concatenate(end_x), np.concatenate(end_y),
+                 "grey", 3)
+
+    raster.discs(frame.vertex_x, frame.vertex_y, 9, "grey")
+
+
+# Set in each export process by attach_export: the sites, the image size and the draw_frame options.
+export_state = None
+
+
+def attach_export(points, width, height, options):
+    global export_state
+    export_state = points, width, height, options
+
+
+def render_frames(sweep_ys, paths):
+    # Sweeps down through the given frames in order, drawing and writing each one.
+    points, width, height, options = export_state
+    sweep = FortuneSweep(chunks=(points,))
+    site_x = np.array(sweep.site_x)
+    site_y = np.array(sweep.site_y)
+    frame = None
+    for sweep_y, path in zip(sweep_ys, paths):
+        sweep.run_until(sweep_y)
+        frame = Frame(sweep, sweep_y, previous=frame)
+        raster = Raster(width, height)
+        draw_frame(raster, frame, site_x, site_y, **options)
+        raster.save(path)
+    return len(paths)
+
+
+def export_sweep(points, directory, frames=100, size=(1900, 1000), max_workers=None, pattern="frame%05d.png",
+                 **options):
+    # Writes `frames` PNGs of the sweep line moving down the image in equal steps, in canvas coordinates as the
+    # visualizer shows them. Frames are dealt out to the processes in turn, so each process sweeps the sites once
+    # and all of them get early, sparse frames as well as late, busy ones. Returns the paths written.
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    width, height = size
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(min(max_workers, frames), 1)
+    os.makedirs(directory, exist_ok=True)
+    sweep_ys = ((np.arange(frames) + 1) * height / frames).tolist()
+    paths = [os.path.join(directory, pattern % frame) for frame in range(frames)]
+    batches = [list(range(start, frames, max_workers)) for start in range(max_workers)]
+    arguments = [([sweep_ys[frame] for frame in batch], [paths[frame] for frame in batch]) for batch in batches]
+    if max_workers == 1:
+        attach_export(points, width, height, options)
+        render_frames(*arguments[0])
+        return paths
+
+    with ProcessPoolExecutor(max_workers, initializer=attach_export, initargs=(points, width, height, options)) as pool:
+        for future in [pool.submit(render_frames, *argument) for argument in arguments]:
+            future.result()
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the sweep over a set of sites as a sequence of PNG frames.")
+    parser.add_argument("sites", help="a .npy, .csv/.txt or raw binary file of sites, as loaders.load_sites reads")
+    parser.add_argument("directory")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--width", type=int, default=1900)
+    parser.add_argument("--height", type=int, default=1000)
+    parser.add_argument("--workers", type=int, help="processes to render with (default: one per CPU)")
+    parser.add_argument("--no-circles", action="store_true")
+    parser.add_argument("--no-parabolas", action="store_true")
+    parser.add_argument("--beachline", action="store_true")
+    args = parser.parse_args()
+
+    chunks = list(load_sites(args.sites))
+    points = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    export_sweep(points, args.directory, args.frames, (args.width, args.height), args.workers,
+                 show_circles=not args.no_circles, show_parabolas=not args.no_parabolas,
+                 show_beachline=args.beachline)
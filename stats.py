@@ -0,0 +1,64 @@
+from array import array
+
+
+class SweepStats:
+    # Counters and timers filled in by FortuneSweep when it is given a stats object, and by VoronoiDiagram.render.
+    # Beach line size, breakpoint evaluations and sweep y are sampled every `sample_every` steps.
+    def __init__(self, sample_every=1):
+        self.sample_every = sample_every
+        self.steps = 0
+        self.site_events = 0
+        self.circle_events = 0
+        self.stale_skipped = 0
+        self.breakpoint_evaluations = 0
+        self.site_seconds = 0.0
+        self.circle_seconds = 0.0
+        self.max_beach_line = 0
+        self.sample_sweep_y = array("d")
+        self.sample_beach_line = array("i")
+        self.sample_breakpoint_evaluations = array("i")
+        self.renders = 0
+        self.items_created = array("i")
+        self.items_updated = array("i")
+        self.items_deleted = array("i")
+
+    def record_step(self, site_event, seconds, stale_skipped, evaluations, arcs_after, sweep_y):
+        # `evaluations` is how many breakpoint positions the step computed while looking up the arc above a site.
+        if site_event:
+            self.site_events += 1
+            self.site_seconds += seconds
+        else:
+            self.circle_events += 1
+            self.circle_seconds += seconds
+        self.stale_skipped += stale_skipped
+        self.breakpoint_evaluations += evaluations
+        self.max_beach_line = max(self.max_beach_line, arcs_after)
+        if self.steps % self.sample_every == 0:
+            self.sample_sweep_y.append(sweep_y)
+            self.sample_beach_line.append(arcs_after)
+            self.sample_breakpoint_evaluations.append(evaluations)
+        self.steps += 1
+
+    def record_render(self, created, updated, deleted):
+        self.renders += 1
+        self.items_created.append(created)
+        self.items_updated.append(updated)
+        self.items_deleted.append(deleted)
+
+    def summary(self):
+        seconds = self.site_seconds + self.circle_seconds
+        return {
+            "steps": self.steps,
+            "site_events": self.site_events,
+            "circle_events": self.circle_events,
+            "stale_skipped": self.stale_skipped,
+            "breakpoint_evaluations": self.breakpoint_evaluations,
+            "site_seconds": self.site_seconds,
+            "circle_seconds": self.circle_seconds,
+            "events_per_second": self.steps / seconds if seconds > 0 else None,
+            "max_beach_line": self.max_beach_line,
+            "renders": self.renders,
+            "items_created": sum(self.items_created),
+            "items_updated": sum(self.items_updated),
+            "items_deleted": sum(self.items_deleted),
+        }
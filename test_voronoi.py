@@ -0,0 +1,204 @@
+import numpy as np
+import pytest
+from dcel import compute_voronoi_cells
+from fortune import FortuneSweep, compute_voronoi
+from incremental import DynamicVoronoi
+from lloyd import relax
+from locator import SiteLocator
+from parallel import parallel_voronoi
+from window import WindowedVoronoi
+from writers import stream_voronoi
+
+
+def nearest_distances(points, queries):
+    return ((points[None, :, :] - queries[:, None, :]) ** 2).sum(axis=2).min(axis=1)
+
+
+def site_sets():
+    rng = np.random.default_rng(0)
+    uniform = rng.random((2000, 2)) * 1000
+    return {
+        "uniform": uniform,
+        "duplicates": np.concatenate((uniform, uniform[:1000])),
+        "integers": rng.integers(0, 60, (5000, 2)).astype(np.float64),
+        "grid": np.array([(x, y) for x in range(30) for y in range(30)], dtype=np.float64) * 10,
+    }
+
+
+@pytest.mark.parametrize("name", ["uniform", "duplicates", "integers", "grid"])
+def test_locator_matches_brute_force(name):
+    points = site_sets()[name]
+    sweep = FortuneSweep(chunks=(points,))
+    sweep.run_all()
+    locator = SiteLocator.from_sweep(sweep)
+    queries = np.random.default_rng(1).random((3000, 2)) * points.max(axis=0)
+    expected = nearest_distances(points, queries)
+    found = locator.locate_many(queries[:, 0], queries[:, 1])
+    assert np.allclose(((points[found] - queries) ** 2).sum(axis=1), expected)
+    for (x, y), distance in zip(queries[:200].tolist(), expected[:200].tolist()):
+        site = locator.locate(x, y)
+        assert np.isclose((points[site, 0] - x) ** 2 + (points[site, 1] - y) ** 2, distance)
+
+
+@pytest.mark.parametrize("name", ["uniform", "duplicates", "integers", "grid"])
+def test_sweep_matches_brute_force(name):
+    # Every Delaunay triangle has an empty circumcircle, the first ones are centred on the vertices in order, and
+    # the diagram is a connected plane graph: with the point at infinity closing the unbounded edges,
+    # V + 1 - E + (cells) = 2.
+    points = site_sets()[name]
+    result = compute_voronoi(points)
+    triangles = points[result.triangles]
+    ax, ay = triangles[:, 0, 0], triangles[:, 0, 1]
+    bx, by = triangles[:, 1, 0] - ax, triangles[:, 1, 1] - ay
+    cx, cy = triangles[:, 2, 0] - ax, triangles[:, 2, 1] - ay
+    d = 2 * (bx * cy - by * cx)
+    assert np.all(d > 0)
+    ux = (cy * (bx * bx + by * by) - by * (cx * cx + cy * cy)) / d
+    uy = (bx * (cx * cx + cy * cy) - cx * (bx * bx + by * by)) / d
+    centers = np.column_stack((ax + ux, ay + uy))
+    radii = ux * ux + uy * uy
+    assert np.allclose(centers[:len(result.vertices)], result.vertices)
+    for start in range(0, len(centers), 500):
+        distances = nearest_distances(points, centers[start:start + 500])
+        assert np.all(distances >= radii[start:start + 500] * (1 - 1e-9))
+    cells = len(np.unique(points, axis=0))
+    assert len(result.edges) == len(result.vertices) + cells - 1
+
+
+def sweep_state(sweep):
+    # The output arrays, the beach line and the pending events, everything the next step depends on.
+    arcs = [(arc.site, arc.right_breakpoint and (arc.right_breakpoint.edge, arc.right_breakpoint.end))
+            for arc in sweep.beach_line]
+    circles = sorted((order, event.y, event.x, event.parabolic_arc.site)
+                     for order, event in sweep.events.pending_circle_events())
+    site = sweep.events.peek_site()
+    return [list(values) for values in sweep.output_arrays()[:-1]] + \
+        [arcs, circles, site and site.site, sweep.processed, sweep.last_site]
+
+
+@pytest.mark.parametrize("name", ["uniform", "duplicates", "grid"])
+def test_seek_matches_run_until(name):
+    points = site_sets()[name]
+    sweep = FortuneSweep(chunks=(points,), checkpoint_every=64)
+    for y in (500.0, 120.0, 121.0, 900.0, 0.0, 300.5, 2000.0, 45.0):
+        sweep.seek(y)
+        fresh = FortuneSweep(chunks=(points,))
+        fresh.run_until(y)
+        assert sweep_state(sweep) == sweep_state(fresh)
+
+
+def same_diagram(result, expected):
+    # Vertices may be numbered differently; compare them as points and edges by the sites they separate.
+    assert len(result.vertices) == len(expected.vertices)
+    assert np.allclose(np.sort(result.vertices, axis=0), np.sort(expected.vertices, axis=0))
+    assert len(result.edges) == len(expected.edges)
+    assert result.neighbors == expected.neighbors
+
+
+@pytest.mark.parametrize("name", ["uniform", "grid"])
+def test_dynamic_voronoi_matches_sweep(name):
+    points = site_sets()[name][:600]
+    diagram = DynamicVoronoi(points[:400])
+    for x, y in points[400:].tolist():
+        diagram.insert(x, y)
+    same_diagram(diagram.result(), compute_voronoi(points))
+    for site in range(0, 600, 3):
+        diagram.remove(site)
+    kept = np.setdiff1d(np.arange(600), np.arange(0, 600, 3))
+    result = diagram.result()
+    expected = compute_voronoi(points[kept])
+    assert [sorted(kept[expected.neighbors[i]].tolist()) for i in range(len(kept))] == \
+        [result.neighbors[site] for site in kept.tolist()]
+    assert np.allclose(np.sort(result.vertices, axis=0), np.sort(expected.vertices, axis=0))
+
+
+@pytest.mark.parametrize("name", ["uniform", "grid60", "integers", "clustered", "horizontal", "vertical", "collinear"])
+def test_parallel_matches_sweep(name):
+    rng = np.random.default_rng(2)
+    if name == "grid60":
+        points = np.array([(x, y) for x in range(60) for y in range(60)], dtype=np.float64)
+    elif name == "integers":
+        # Many sites share a circle, and their circle events a key.
+        points = rng.integers(0, 300, size=(20000, 2)).astype(np.float64)
+    elif name == "clustered":
+        # Tiles fail certification here and have to be widened towards the neighbouring clusters.
+        centers = rng.random((8, 2)) * 1000
+        points = centers[rng.integers(8, size=8000)] + rng.normal(scale=15.0, size=(8000, 2))
+    elif name == "horizontal":
+        points = np.column_stack((np.arange(20000.0), np.zeros(20000)))
+    elif name == "vertical":
+        points = np.column_stack((np.zeros(20000), np.arange(20000.0)))
+    elif name == "collinear":
+        # Nearly collinear after rounding: the vertices lie far off, some are only found in exact arithmetic, and
+        # rounding puts many circle events above the event that queued them.
+        x = rng.random(4000) * 1000
+        points = np.column_stack((x, 0.5 * x + 100))
+    else:
+        points = rng.random((20000, 2)) * 1000
+    result = parallel_voronoi(points, tiles=3, max_guard=1.0)
+    expected = compute_voronoi(points)
+    assert np.array_equal(result.vertices, expected.vertices)
+    assert np.array_equal(result.triangles, expected.triangles)
+    assert np.array_equal(result.edges, expected.edges)
+    assert result.neighbors == expected.neighbors
+
+
+@pytest.mark.parametrize("name", ["uniform", "duplicates", "grid"])
+def test_stream_matches_sweep(name):
+    points = site_sets()[name]
+    records = list(stream_voronoi(chunks=(points,)))
+    expected = compute_voronoi(points)
+    vertices = np.array([record[2:] for record in records if record[0] == "vertex"]).reshape(-1, 2)
+    edges = np.array([record[2:] for record in records if record[0] == "edge"], dtype=np.int32).reshape(-1, 4)
+    assert np.array_equal(vertices, expected.vertices)
+    assert np.array_equal(np.unique(edges, axis=0), np.unique(expected.edges, axis=0))
+
+
+def polygon_area(polygon):
+    x, y = polygon[:, 0], polygon[:, 1]
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+@pytest.mark.parametrize("name", ["uniform", "duplicates", "grid", "one point"])
+def test_cells_cover_box(name):
+    points = np.array([(1.0, 1.0)] * 3) if name == "one point" else site_sets()[name][::5]
+    cells = compute_voronoi_cells(points.tolist(), (-10, -10, 1010, 1010))
+    assert np.isclose(sum(polygon_area(cell) for cell in cells if len(cell)), 1020 * 1020)
+    for site, cell in enumerate(cells):
+        first = np.flatnonzero((points == points[site]).all(axis=1))[0]
+        assert (len(cell) > 0) == (first == site)
+
+
+def polygon_centroid(polygon):
+    x, y = polygon[:, 0], polygon[:, 1]
+    cross = x * np.roll(y, -1) - np.roll(x, -1) * y
+    return np.array((np.dot(x + np.roll(x, -1), cross), np.dot(y + np.roll(y, -1), cross))) / (3 * cross.sum())
+
+
+@pytest.mark.parametrize("name", ["uniform", "grid"])
+def test_relax_matches_cell_centroids(name):
+    # One step moves every site to the centroid of its clipped cell; carrying the triangulation over from one
+    # step to the next changes nothing but rounding.
+    points = site_sets()[name][::5]
+    bbox = (-10, -10, 1010, 1010)
+    expected = np.array([polygon_centroid(cell) for cell in compute_voronoi_cells(points.tolist(), bbox)])
+    assert np.allclose(relax(points, 1, bbox), expected)
+    assert np.allclose(relax(points, 10, bbox, warm_start=True), relax(points, 10, bbox, warm_start=False),
+                       rtol=0, atol=1e-11)
+    assert relax([], 3, bbox).shape == (0, 2)
+
+
+@pytest.mark.parametrize("name", ["uniform", "integers", "grid"])
+def test_window_cells_match_brute_force(name):
+    # Every point of a window is nearest to a site whose cell the window reports, also for windows reaching past
+    # the sites and for one of zero width. The guard starts small, so that certify() has to send it out.
+    points = site_sets()[name]
+    windowed = WindowedVoronoi(points)
+    rng = np.random.default_rng(3)
+    for box in ((0.4, 0.4, 0.45, 0.43), (-0.05, 0.9, 0.1, 1.2), (0.95, -0.1, 1.3, 0.05), (0.5, 0.2, 0.5, 0.7),
+                (0.0, 0.0, 1.0, 1.0)):
+        x0, y0, x1, y1 = np.array(box) * np.tile(points.max(axis=0), 2)
+        queries = np.column_stack((rng.uniform(x0, x1, 300), rng.uniform(y0, y1, 300)))
+        result = windowed.compute((x0, y0, x1, y1), guard=0.001 * points.max())
+        assert np.allclose(nearest_distances(points[result.sites[result.cells]], queries),
+                           nearest_distances(points, queries))
@@ -0,0 +1,141 @@
+import math
+import numpy as np
+
+
+def parabola_coefficients(focus_x, focus_y, sweep_y, out=None):
+    if out is None:
+        out = np.empty((3, len(focus_x)))
+    a, b, c = out
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(0.5, np.subtract(focus_y, sweep_y), out=a)
+        np.multiply(focus_x, a, out=b)
+        b *= -2
+        np.multiply(focus_x, focus_x, out=c)
+        c += np.multiply(focus_y, focus_y)
+        c -= sweep_y * sweep_y
+        c *= a
+    return out
+
+
+def parabola_polyline(a, b, c, x_min, x_max, viewport, tolerance=0.5, spacing=2.0):
+    # Flat [x0, y0, x1, y1, ...] coordinates of y = a x^2 + b x + c over [x_min, x_max], clipped to the viewport.
+    # Samples are spread over the tangent angle so that each chord stays within `tolerance` pixels of the curve,
+    # which puts them near the vertex and thins them out along the flat tails; `spacing` caps the count by the
+    # on-screen length.
+    left, top, right, bottom = viewport
+    x_min = max(x_min, left)
+    x_max = min(x_max, right)
+    if a == 0:
+        if x_max <= x_min:
+            return []
+        return [x_min, b * x_min + c, x_max, b * x_max + c]
+
+    # Only the part of the parabola between its vertex and the edge it opens towards can be on screen.
+    edge = top if a < 0 else bottom
+    discriminant = b * b - 4 * a * (c - edge)
+    if discriminant <= 0:
+        return []
+    vertex_x = -b / (2 * a)
+    half_width = math.sqrt(discriminant) / (2 * abs(a))
+    x_min = max(x_min, vertex_x - half_width)
+    x_max = min(x_max, vertex_x + half_width)
+    if x_max <= x_min:
+        return []
+
+    theta = np.linspace(math.atan(2 * a * x_min + b), math.atan(2 * a * x_max + b), 65)
+    density = np.cos(theta) ** -1.5 / math.sqrt(16 * abs(a) * tolerance)
+    steps = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.abs(np.diff(theta)))))
+
+    x = (np.tan(theta) - b) / (2 * a)
+    y = (a * x + b) * x + c
+    length = np.hypot(np.diff(x), np.diff(y)).sum()
+    count = int(min(math.ceil(steps[-1]), length / spacing)) + 2
+
+    x = (np.tan(np.interp(np.linspace(0, steps[-1], count), steps, theta)) - b) / (2 * a)
+    x[0] = x_min
+    x[-1] = x_max
+    y = (a * x + b) * x + c
+    return np.column_stack((x, y)).ravel().tolist()
+
+
+def breakpoints(left_x, left_y, right_x, right_y, sweep_y, out=None):
+    if out is None:
+        out = (np.empty(len(left_x)), np.empty(len(left_x)))
+    x, y = out
+
+    # Same closed form as fortune.breakpoint_x, with its special cases applied as masks afterwards.
+    d_left = sweep_y - left_y
+    d_right = sweep_y - right_y
+    a = d_left - d_right
+    dx = right_x - left_x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.sqrt(d_left * d_right * (dx * dx + a * a))
+        np.copyto(x, np.where(dx < 0, (d_left * dx - s) / a, d_left * (dx * dx - a * d_right) / (d_left * dx + s)))
+        x += left_x
+        np.copyto(x, right_x, where=d_right == 0)
+        np.copyto(x, left_x, where=d_left == 0)
+        np.copyto(x, (left_x + right_x) / 2, where=left_y == right_y)
+
+        far_left = left_y < right_y
+        focus_x = np.where(far_left, left_x, right_x)
+        distance = np.where(far_left, d_left, d_right)
+        np.copyto(y, (sweep_y - distance / 2) - (x - focus_x) ** 2 / (2 * distance))
+        np.copyto(y, -np.inf, where=distance == 0)
+    return out
+
+
+def circumcircles(x1, y1, x2, y2, x3, y3):
+    # Determinant form relative to the first site of each triple; collinear triples come back as degenerate.
+    bx = np.subtract(x2, x1)
+    by = np.subtract(y2, y1)
+    cx = np.subtract(x3, x1)
+    cy = np.subtract(y3, y1)
+    d = 2 * (bx * cy - by * cx)
+    degenerate = d == 0
+    b2 = bx * bx + by * by
+    c2 = cx * cx + cy * cy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ux = (cy * b2 - by * c2) / d
+        uy = (bx * c2 - cx * b2) / d
+    centers = np.stack((x1 + ux, y1 + uy), axis=-1)
+    radii = np.hypot(ux, uy)
+    centers[degenerate] = np.nan
+    radii[degenerate] = np.inf
+    return centers, radii, degenerate
+
+
+class BeachLineArrays:
+    # Structure-of-arrays copy of a beach line: one focus per arc from left to right, the parabola coefficients
+    # of every arc and the position of every breakpoint, all re-evaluated for a new sweep y in one call.
+    def __init__(self, focus_x, focus_y, breakpoints=()):
+        self.focus_x = np.array(focus_x, dtype=np.float64)
+        self.focus_y = np.array(focus_y, dtype=np.float64)
+        self.breakpoints = list(breakpoints)
+        self.coefficients = np.empty((3, len(self.focus_x)))
+        self.breakpoint_x = np.empty(max(len(self.focus_x) - 1, 0))
+        self.breakpoint_y = np.empty(max(len(self.focus_x) - 1, 0))
+        self.sweep_y = None
+
+    @classmethod
+    def from_sweep(cls, sweep):
+        arcs = []
+        arc_breakpoints = []
+        for parabolic_arc in sweep.parabolic_arcs():
+            arcs.append(parabolic_arc.site)
+            if parabolic_arc.right_breakpoint is not None:
+                arc_breakpoints.append(parabolic_arc.right_breakpoint)
+        return cls([sweep.site_x[site] for site in arcs], [sweep.site_y[site] for site in arcs], arc_breakpoints)
+
+    def __len__(self):
+        return len(self.focus_x)
+
+    def update(self, sweep_y):
+        if sweep_y != self.sweep_y:
+            parabola_coefficients(self.focus_x, self.focus_y, sweep_y, out=self.coefficients)
+            breakpoints(self.focus_x[:-1], self.focus_y[:-1], self.focus_x[1:], self.focus_y[1:], sweep_y,
+                        out=(self.breakpoint_x, self.breakpoint_y))
+            self.sweep_y = sweep_y
+        return self
+
+    def arc_bounds(self, left=-np.inf, right=np.inf):
+        return np.concatenate(([left], self.breakpoint_x)), np.concatenate((self.breakpoint_x, [right]))
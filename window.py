@@ -0,0 +1,129 @@
+from collections import namedtuple
+import numpy as np
+from fortune import FortuneSweep
+from geometry import clip_lines
+from grid import BucketGrid
+
+# sites maps the local site numbers of `result`, the diagram of the sites swept, to indices into the full set;
+# cells holds the local numbers of the sites whose cells meet the window, and guard the margin that certified it.
+WindowResult = namedtuple("WindowResult", ["sites", "cells", "result", "guard"])
+
+
+class SiteGrid(BucketGrid):
+    # The sites on a BucketGrid, stored sorted by bucket with CSR offsets so that the sites in a box come out as
+    # one contiguous slice per grid row. Building it is the only step that looks at every site.
+    def __init__(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.site_x = np.ascontiguousarray(points[:, 0])
+        self.site_y = np.ascontiguousarray(points[:, 1])
+        super().__init__(self.site_x, self.site_y)
+
+        buckets = self.buckets(self.site_x, self.site_y)
+        self.order = np.argsort(buckets, kind="stable")
+        self.indptr = np.zeros(self.size * self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(buckets, minlength=self.size * self.size), out=self.indptr[1:])
+
+    def __len__(self):
+        return len(self.site_x)
+
+    def query(self, box):
+        # Indices of the sites inside box = (x0, y0, x1, y1), in no particular order.
+        x0, y0, x1, y1 = box
+        grid_x0, grid_y0, grid_x1, grid_y1 = self.box
+        if len(self) == 0 or x1 < grid_x0 or x0 > grid_x1 or y1 < grid_y0 or y0 > grid_y1:
+            return np.empty(0, dtype=np.int64)
+        (row0, row1), (column0, column1) = self.cells((x0, x1), (y0, y1))
+        starts = self.indptr[np.arange(row0, row1 + 1) * self.size + column0]
+        ends = self.indptr[np.arange(row0, row1 + 1) * self.size + column1 + 1]
+        sites = self.order[np.concatenate([np.arange(start, end) for start, end in zip(starts.tolist(), ends.tolist())])]
+        x = self.site_x[sites]
+        y = self.site_y[sites]
+        return sites[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)]
+
+
+def edge_lines(site_x, site_y, vertices, edges):
+    # Every edge as the bisector m + t d of its two sites, d pointing towards end 0, with the parameter range
+    # between its ends; an end still open is infinite.
+    left = edges[:, 0]
+    right = edges[:, 1]
+    px = (site_x[left] + site_x[right]) / 2
+    py = (site_y[left] + site_y[right]) / 2
+    dx = site_y[left] - site_y[right]
+    dy = site_x[right] - site_x[left]
+    length2 = dx * dx + dy * dy
+    t0 = np.full(len(edges), -np.inf)
+    t1 = np.full(len(edges), np.inf)
+    for t, end in ((t1, 2), (t0, 3)):
+        closed = edges[:, end] >= 0
+        node = edges[closed, end]
+        t[closed] = ((vertices[node, 0] - px[closed]) * dx[closed] + (vertices[node, 1] - py[closed]) * dy[closed]) \
+            / length2[closed]
+    return px, py, dx, dy, t0, t1
+
+
+def certify(site_x, site_y, result, box, region):
+    # Whether the diagram of the swept sites is the diagram of the full set everywhere inside `box`, given that
+    # every site in `region` was swept, and the sites whose cells meet the box. Within each cell clipped to the box
+    # the distance to the cell's site is convex and the distance to the outside of `region` concave, so it is
+    # enough that the first stays below the second at the corners of those pieces: the Voronoi vertices in the
+    # box, the points where edges cross its boundary and its own corners. A site outside `region` is then never
+    # nearer than the swept site that owns the point.
+    x0, y0, x1, y1 = box
+    corners = np.array(((x0, y0), (x1, y0), (x1, y1), (x0, y1)))
+    owners = np.argmin((site_x[None, :] - corners[:, :1]) ** 2 + (site_y[None, :] - corners[:, 1:]) ** 2, axis=1)
+    points = [corners]
+    sites = [owners]
+
+    edges = result.edges
+    if len(edges):
+        px, py, dx, dy, t0, t1 = edge_lines(site_x, site_y, result.vertices, edges)
+        t0, t1 = clip_lines(px, py, dx, dy, t0, t1, box)
+        crossing = t0 <= t1
+        for t in (t0, t1):
+            t = t[crossing]
+            points.append(np.column_stack((px[crossing] + t * dx[crossing], py[crossing] + t * dy[crossing])))
+            sites.append(edges[crossing, 0])
+        cells = np.unique(np.concatenate((owners, edges[crossing, 0], edges[crossing, 1])))
+    else:
+        cells = np.unique(owners)
+
+    points = np.concatenate(points)
+    sites = np.concatenate(sites)
+    reach = np.hypot(points[:, 0] - site_x[sites], points[:, 1] - site_y[sites])
+    rx0, ry0, rx1, ry1 = region
+    clearance = np.minimum(np.minimum(points[:, 0] - rx0, rx1 - points[:, 0]),
+                           np.minimum(points[:, 1] - ry0, ry1 - points[:, 1]))
+    return bool(np.all(reach <= clearance)), cells
+
+
+class WindowedVoronoi:
+    # Diagrams of a large site set restricted to a window, at a cost that grows with the number of sites near the
+    # window rather than with the set: the sites within a guard margin of the window are looked up on a SiteGrid
+    # and swept on their own, and the margin doubles until certify() proves the result exact inside the window.
+    def __init__(self, points):
+        self.grid = SiteGrid(points)
+
+    def compute(self, box, guard=None):
+        x0, y0, x1, y1 = box
+        if guard is None:
+            guard = 2 * max(self.grid.bucket_width, self.grid.bucket_height)
+        while True:
+            region = (x0 - guard, y0 - guard, x1 + guard, y1 + guard)
+            sites = np.sort(self.grid.query(region))
+            everything = len(sites) == len(self.grid)
+            if len(sites) > 0:
+                site_x = self.grid.site_x[sites]
+                site_y = self.grid.site_y[sites]
+                sweep = FortuneSweep(chunks=(np.column_stack((site_x, site_y)),))
+                sweep.run_all()
+                result = sweep.result()
+                certified, cells = certify(site_x, site_y, result, box, region)
+                if certified or everything:
+                    return WindowResult(sites, cells, result, guard)
+            elif everything:
+                return WindowResult(sites, np.empty(0, dtype=np.int64), FortuneSweep().result(), guard)
+            guard *= 2
+
+
+def windowed_voronoi(points, box, guard=None):
+    return WindowedVoronoi(points).compute(box, guard)
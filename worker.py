@@ -0,0 +1,185 @@
+import math
+import queue
+import threading
+import numpy as np
+from vectorized import BeachLineArrays, parabola_coefficients, parabola_polyline
+
+# Keys that move the sweep line, and keys that switch parabolas and the beach line on and off; frames only hold
+# polylines for what is switched on.
+SWEEP_KEYS = ("Down", "Up", "n", "Return")
+CURVE_KEYS = ("p", "b")
+
+
+def frozen(values, dtype):
+    values = np.frombuffer(values, dtype=dtype).copy() if len(values) else np.empty(0, dtype=dtype)
+    values.flags.writeable = False
+    return values
+
+
+class Frame:
+    # Everything VoronoiDiagram.render draws, copied out of a sweep at one sweep y: vertices, edges, the beach line
+    # evaluated at that y and the pending circle events, as rows of (x, y, cx, cy, cr). Given a viewport, it also holds the on-screen polylines
+    # of the parabolas of all swept sites and of the beach line arcs, as (site or arc, coords) pairs, so that
+    # whoever draws the frame only hands coordinates on. A frame is never changed once made, so it can be passed
+    # from the thread running the sweep to the one drawing it. `serial` is the last command it reflects.
+    __slots__ = ("serial", "version", "sweep_y", "vertex_x", "vertex_y", "edge_origin_x", "edge_origin_y",
+                 "edge_nodes", "beach_line", "circle_events", "parabolas", "beach_arcs")
+
+    def __init__(self, sweep, sweep_y, serial=0, previous=None, viewport=None, parabolas=False, beach_arcs=False):
+        self.serial = serial
+        self.version = sweep.version
+        self.sweep_y = sweep_y
+        self.vertex_x = frozen(sweep.vertex_x, np.float64)
+        self.vertex_y = frozen(sweep.vertex_y, np.float64)
+        self.edge_origin_x = frozen(sweep.edge_origin_x, np.float64)
+        self.edge_origin_y = frozen(sweep.edge_origin_y, np.float64)
+        self.edge_nodes = frozen(sweep.edge_nodes, np.int32)
+        if previous is not None and previous.version == sweep.version:
+            # Arcs and breakpoints are unchanged since the previous frame; only their positions move with y.
+            beach_line = previous.beach_line
+            beach_line = BeachLineArrays(beach_line.focus_x, beach_line.focus_y, beach_line.breakpoints)
+        else:
+            beach_line = BeachLineArrays.from_sweep(sweep)
+        self.beach_line = beach_line.update(sweep_y)
+        circle_events = np.array([(event.x, event.y, event.cx, event.cy, event.cr) for event in sweep.events],
+                                 dtype=np.float64).reshape(-1, 5)
+        circle_events.flags.writeable = False
+        self.circle_events = circle_events
+        self.parabolas = ()
+        self.beach_arcs = ()
+        if viewport is not None and parabolas:
+            self.parabolas = tuple(parabola_polylines(sweep, sweep_y, viewport))
+        if viewport is not None and beach_arcs:
+            self.beach_arcs = tuple(beach_arc_polylines(self.beach_line, sweep_y, viewport))
+
+
+def parabola_polylines(sweep, sweep_y, viewport):
+    site_x = frozen(sweep.site_x, np.float64)
+    site_y = frozen(sweep.site_y, np.float64)
+    sites = np.flatnonzero(site_y < sweep_y)
+    coefficients = parabola_coefficients(site_x[sites], site_y[sites], sweep_y)
+    for site, (a, b, c) in zip(sites.tolist(), coefficients.T.tolist()):
+        coords = parabola_polyline(a, b, c, -math.inf, math.inf, viewport)
+        if len(coords) >= 4:
+            yield site, tuple(coords)
+
+
+def beach_arc_polylines(beach_line, sweep_y, viewport):
+    lefts, rights = beach_line.arc_bounds()
+    visible = (beach_line.focus_y < sweep_y).tolist()
+    for arc, ((a, b, c), left, right) in enumerate(zip(beach_line.coefficients.T.tolist(), lefts.tolist(),
+                                                       rights.tolist())):
+        if visible[arc]:
+            coords = parabola_polyline(a, b, c, left, right, viewport)
+            if len(coords) >= 4:
+                yield arc, tuple(coords)
+
+
+def moved_y(y, key, delta=2):
+    # Where the arrow keys put the sweep line; it does not go above the top of the canvas.
+    if key == "Down":
+        return y + delta
+    if key == "Up" and y - delta >= 0:
+        return y - delta
+    return y
+
+
+def bring_to(sweep, y):
+    # Puts the sweep at y: forward by running on, backward through the checkpoints.
+    if y < sweep.sweep_y:
+        sweep.seek(y)
+    else:
+        sweep.run_until(y)
+
+
+def move_sweep(sweep, y, key, delta=2):
+    # Applies one of SWEEP_KEYS to a sweep brought to y and returns the new sweep line y. "n" jumps straight to
+    # the next event, "Return" past the last one.
+    if key == "n":
+        bring_to(sweep, y)
+        if sweep.has_events():
+            y = max(y, sweep.step_event().y)
+    elif key == "Return":
+        bring_to(sweep, y)
+        sweep.run_all()
+        y = max(y, sweep.sweep_y + delta)
+    else:
+        y = moved_y(y, key, delta)
+    bring_to(sweep, y)
+    return y
+
+
+class SweepWorker:
+    # Runs a sweep on a thread of its own so that Tk never waits on it. Keys come in through an unbounded command
+    # queue and are applied in batches, arrow keys only moving the target y, so a burst of key presses costs one
+    # seek. After each batch a Frame goes out through a queue holding a single frame; a newer frame replaces one
+    # not yet taken, so the drawing side only ever sees the latest. CURVE_KEYS switch which polylines the frames
+    # carry, given a viewport to fit them to.
+    def __init__(self, sweep, y=0, delta=2, viewport=None, parabolas=True, beach_arcs=False):
+        self.sweep = sweep
+        self.y = y
+        self.delta = delta
+        self.viewport = viewport
+        self.parabolas = parabolas
+        self.beach_arcs = beach_arcs
+        self.serial = 0
+        self.commands = queue.SimpleQueue()
+        self.frames = queue.Queue(maxsize=1)
+        self.frame = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.commands.put((0, None))
+
+    def send(self, key):
+        self.serial += 1
+        self.commands.put((self.serial, key))
+        return self.serial
+
+    def latest(self):
+        frame = None
+        while True:
+            try:
+                frame = self.frames.get_nowait()
+            except queue.Empty:
+                return frame
+
+    def close(self):
+        self.commands.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            batch = [self.commands.get()]
+            while True:
+                try:
+                    batch.append(self.commands.get_nowait())
+                except queue.Empty:
+                    break
+            serial = self.frame.serial if self.frame is not None else 0
+            for command in batch:
+                if command is None:
+                    return
+                serial, key = command
+                if key in ("Down", "Up"):
+                    self.y = moved_y(self.y, key, self.delta)
+                elif key == "p":
+                    self.parabolas = not self.parabolas
+                elif key == "b":
+                    self.beach_arcs = not self.beach_arcs
+                elif key is not None:
+                    self.y = move_sweep(self.sweep, self.y, key, self.delta)
+            bring_to(self.sweep, self.y)
+            self.frame = Frame(self.sweep, self.y, serial, self.frame, self.viewport, self.parabolas,
+                               self.beach_arcs)
+            self.publish(self.frame)
+
+    def publish(self, frame):
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
@@ -0,0 +1,209 @@
+import json
+import struct
+import tempfile
+from array import array
+import numpy as np
+from fortune import FortuneSweep
+from geometry import box_exit
+
+# A sink receives the output of a sweep while it runs:
+#   open(sweep)                                 once, before the first event
+#   vertex(node, x, y)                          as each Voronoi vertex is found, in node order
+#   edge(edge, left, right, node0, node1)       once both ends of an edge are fixed, or at the end of the sweep for
+#                                               edges that stay unbounded (-1) at one or both ends
+# Every vertex is handed over before the first edge that refers to it. The sweep keeps nothing it has handed over;
+# while edge() runs, sweep.traced[edge] still holds the edge's origin and the points of its fixed ends.
+
+BINARY_MAGIC = b"VOR1"
+BINARY_VERTEX = struct.Struct("<cidd")
+BINARY_EDGE = struct.Struct("<ciiiii")
+BINARY_RECORD = np.dtype([("tag", "S1"), ("data", "V20")])
+
+
+class Sink:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self, sweep):
+        self.sweep = sweep
+
+    def vertex(self, node, x, y):
+        pass
+
+    def edge(self, edge, left, right, node0, node1):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordSink(Sink):
+    # Holds records as ("vertex", node, x, y) and ("edge", edge, left, right, node0, node1) tuples until taken.
+    def __init__(self):
+        self.records = []
+
+    def vertex(self, node, x, y):
+        self.records.append(("vertex", node, x, y))
+
+    def edge(self, edge, left, right, node0, node1):
+        self.records.append(("edge", edge, left, right, node0, node1))
+
+    def take(self):
+        records = self.records
+        self.records = []
+        return records
+
+
+class NpzWriter(Sink):
+    # Spools vertices and edges to temporary files and packs them into `vertices` (V, 2) and `edges` (E, 4) arrays
+    # on close; numpy copies the memory-mapped spools into the archive in buffered pieces. Edges are stored in the
+    # order they were finished.
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.vertex_file = tempfile.TemporaryFile()
+        self.edge_file = tempfile.TemporaryFile()
+        self.vertex_buffer = array("d")
+        self.edge_buffer = array("i")
+
+    def vertex(self, node, x, y):
+        self.vertex_buffer.append(x)
+        self.vertex_buffer.append(y)
+        if len(self.vertex_buffer) >= self.buffer_size:
+            self.flush()
+
+    def edge(self, edge, left, right, node0, node1):
+        self.edge_buffer.extend((left, right, node0, node1))
+        if len(self.edge_buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.vertex_buffer.tofile(self.vertex_file)
+        self.edge_buffer.tofile(self.edge_file)
+        del self.vertex_buffer[:]
+        del self.edge_buffer[:]
+
+    def spooled(self, f, dtype, columns):
+        f.flush()
+        if f.tell() == 0:
+            return np.empty((0, columns), dtype=dtype)
+        return np.memmap(f, dtype=dtype, mode="r").reshape(-1, columns)
+
+    def close(self):
+        if self.vertex_file.closed:
+            return
+        self.flush()
+        np.savez(self.path, vertices=self.spooled(self.vertex_file, np.float64, 2),
+                 edges=self.spooled(self.edge_file, np.int32, 4))
+        self.vertex_file.close()
+        self.edge_file.close()
+
+
+class BinaryWriter(Sink):
+    # Compact record stream after a 4-byte magic: every record is 21 bytes, a one-byte tag then either
+    # b"V" node:int32 x:float64 y:float64 or b"E" left right node0 node1 edge:int32, all little-endian.
+    def __init__(self, path, buffer_size=1 << 16):
+        self.file = open(path, "wb")
+        self.file.write(BINARY_MAGIC)
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+
+    def vertex(self, node, x, y):
+        self.buffer += BINARY_VERTEX.pack(b"V", node, x, y)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def edge(self, edge, left, right, node0, node1):
+        self.buffer += BINARY_EDGE.pack(b"E", left, right, node0, node1, edge)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def read_binary(path):
+    # Returns (vertices (V, 2), edges (E, 4), edge indices (E,)) from a BinaryWriter file.
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError("%s is not a Voronoi binary file" % path)
+        records = np.fromfile(f, dtype=BINARY_RECORD)
+    vertices = np.frombuffer(records["data"][records["tag"] == b"V"].tobytes(),
+                             dtype=np.dtype([("node", "<i4"), ("x", "<f8"), ("y", "<f8")]))
+    edges = np.frombuffer(records["data"][records["tag"] == b"E"].tobytes(), dtype="<i4").reshape(-1, 5)
+    points = np.empty((len(vertices), 2))
+    points[vertices["node"], 0] = vertices["x"]
+    points[vertices["node"], 1] = vertices["y"]
+    return points, edges[:, :4].copy(), edges[:, 4].copy()
+
+
+class GeoJSONWriter(Sink):
+    # One Point feature per vertex and one LineString feature per edge, written as they arrive. Unbounded ends
+    # are cut where they leave `bbox` (grown to hold the rest of the edge, if need be).
+    def __init__(self, path, bbox):
+        self.file = open(path, "w")
+        self.bbox = bbox
+        self.separator = ""
+        self.file.write('{"type": "FeatureCollection", "features": [')
+
+    def write_feature(self, geometry, properties):
+        self.file.write(self.separator)
+        self.file.write(json.dumps({"type": "Feature", "geometry": geometry, "properties": properties}))
+        self.separator = ",\n"
+
+    def vertex(self, node, x, y):
+        self.write_feature({"type": "Point", "coordinates": [x, y]}, {"node": node})
+
+    def edge(self, edge, left, right, node0, node1):
+        sweep = self.sweep
+        origin_x, origin_y, node0, node1, end0_x, end0_y, end1_x, end1_y = sweep.traced[edge][2:]
+        dx = sweep.site_y[left] - sweep.site_y[right]
+        dy = sweep.site_x[right] - sweep.site_x[left]
+        if node1 >= 0:
+            anchor = end1_x, end1_y
+        else:
+            anchor = origin_x, origin_y
+        x0, y0, x1, y1 = self.bbox
+        box = min(x0, anchor[0]), min(y0, anchor[1]), max(x1, anchor[0]), max(y1, anchor[1])
+
+        if node0 >= 0:
+            end0 = end0_x, end0_y
+        else:
+            end0 = box_exit(anchor[0], anchor[1], dx, dy, box)
+        if node1 >= 0:
+            end1 = anchor
+        else:
+            end1 = box_exit(anchor[0], anchor[1], -dx, -dy, box)
+        self.write_feature({"type": "LineString", "coordinates": [[float(end1[0]), float(end1[1])],
+                                                                  [float(end0[0]), float(end0[1])]]},
+                           {"edge": edge, "left": left, "right": right, "nodes": [node0, node1]})
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write("]}\n")
+            self.file.close()
+
+
+def stream_voronoi(points=(), chunks=None):
+    # Yields the records of a RecordSink between sweep steps, so the diagram can be consumed as it is built.
+    sink = RecordSink()
+    sweep = FortuneSweep(points, chunks, sink)
+    while True:
+        event = sweep.step_event()
+        yield from sink.take()
+        if event is None:
+            return
+
+
+def write_voronoi(sink, points=(), chunks=None):
+    with sink:
+        FortuneSweep(points, chunks, sink).run_all()